@@ -1,5 +0,0 @@
-import logging.config
-
-from rii.logging_config import LOGGING_CONFIG
-
-logging.config.dictConfig(LOGGING_CONFIG)
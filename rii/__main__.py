@@ -0,0 +1,3 @@
+from rii.cli import rii
+
+rii(prog_name="rii")
@@ -0,0 +1,211 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import time
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import click
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "rii"
+DEFAULT_MAX_SIZE_GB = 20.0
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def package_version() -> str:
+    try:
+        return version("RII")
+    except PackageNotFoundError:
+        return "dev"
+
+
+def file_hash(file: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file, "rb") as fi:
+        while block := fi.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize(value: Any) -> Any:
+    if isinstance(value, (tuple, list)):
+        return [normalize(v) for v in value]
+    if isinstance(value, Path):
+        return str(value)
+    return value
+
+
+class ResultCache:
+    """Directory of command outputs keyed by inputs content hash, options and version.
+
+    Every entry is a subdirectory with output files and meta.json, whose
+    mtime marks last use for LRU eviction. Input hashes are remembered in
+    fingerprints/ by path, size, mtime and inode, so an unchanged multi-GB
+    dump is hashed once.
+    """
+
+    def __init__(self, directory: Path, max_size: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.fingerprints = directory / "fingerprints"
+        self.fingerprints.mkdir(parents=True, exist_ok=True)
+
+    def fingerprint(self, file: Path) -> str:
+        """Hash of the whole file content, read from fingerprints/ if file is unchanged."""
+
+        stat = file.stat()
+        identity = (
+            f"{file.resolve()}\0{stat.st_size}\0{stat.st_mtime_ns}\0{stat.st_ino}"
+        )
+        path = self.fingerprints / hashlib.sha256(identity.encode()).hexdigest()
+        if path.exists():
+            return path.read_text()
+
+        content_hash = file_hash(file)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        tmp.write_text(content_hash)
+        tmp.replace(path)
+        return content_hash
+
+    def key(self, command: str, inputs: Iterable[Path], options: dict) -> str:
+        description = {
+            "command": command,
+            "inputs": [self.fingerprint(file) for file in inputs],
+            "options": {name: normalize(value) for name, value in options.items()},
+            "version": package_version(),
+        }
+        return hashlib.sha256(
+            json.dumps(description, sort_keys=True).encode()
+        ).hexdigest()
+
+    def get(self, key: str, outputs: list[Path]) -> bool:
+        """Copy cached outputs to their places, False on miss."""
+
+        entry = self.directory / key
+        meta_path = entry / "meta.json"
+        if not meta_path.exists():
+            return False
+        with open(meta_path, "r") as fi:
+            meta = json.load(fi)
+        if meta["outputs"] != len(outputs):
+            return False
+
+        for i, name in meta["files"]:
+            output = outputs[i]
+            # Copies, not links: outputs edited in place must not change entry
+            output.unlink(missing_ok=True)
+            shutil.copy2(entry / name, output)
+        meta_path.touch()
+        return True
+
+    def put(self, key: str, outputs: list[Path]) -> None:
+        entry = self.directory / key
+        tmp = self.directory / f".{key}.{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+
+        # Outputs a run did not produce (e.g. optional table) are skipped
+        files = []
+        for i, output in enumerate(outputs):
+            if not output.exists():
+                continue
+            name = f"{i}{''.join(output.suffixes)}"
+            shutil.copy2(output, tmp / name)
+            files.append((i, name))
+        meta = {"outputs": len(outputs), "files": files, "created": time.time()}
+        with open(tmp / "meta.json", "w") as fo:
+            json.dump(meta, fo)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.rename(entry)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for entry in self.directory.iterdir():
+            meta_path = entry / "meta.json"
+            if entry.name.startswith(".") or not meta_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((meta_path.stat().st_mtime, size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def cached_command(
+    inputs: tuple[str, ...],
+    outputs: Callable[[dict], list[Path]],
+    exclude: tuple[str, ...] = ("output",),
+    cacheable: Callable[[dict], bool] = lambda params: True,
+) -> Callable:
+    """Serve click command from ResultCache if the same inputs and options were run before.
+
+    inputs are names of file parameters to fingerprint, outputs maps command
+    parameters to files this run produces (only those, they are cleared
+    before a cached run), exclude lists parameters not affecting them.
+    cacheable tells if outputs are determined by parameters at all (e.g. not
+    for unseeded random sampling).
+    """
+
+    def decorator(f: Callable) -> Callable:
+        @click.option("--no-cache", is_flag=True, help="Do not use result cache")
+        @click.option("--refresh", is_flag=True, help="Recompute and update cache")
+        @click.option(
+            "--cache-dir",
+            type=click.Path(file_okay=False, path_type=Path),
+            envvar="RII_CACHE_DIR",
+            default=DEFAULT_CACHE_DIR,
+            show_default=True,
+        )
+        @click.option(
+            "--cache-max-size",
+            type=float,
+            envvar="RII_CACHE_MAX_SIZE",
+            default=DEFAULT_MAX_SIZE_GB,
+            show_default=True,
+            help="Cache size limit, GB",
+        )
+        @functools.wraps(f)
+        def wrapper(
+            no_cache: bool,
+            refresh: bool,
+            cache_dir: Path,
+            cache_max_size: float,
+            **kwargs,
+        ) -> None:
+            if no_cache or not cacheable(kwargs):
+                return f(**kwargs)
+
+            output_paths = outputs(kwargs)
+            # Stale outputs of a previous run must not be cached for this one
+            for path in output_paths:
+                path.unlink(missing_ok=True)
+
+            cache = ResultCache(cache_dir, int(cache_max_size * 1024**3))
+            options = {
+                name: value
+                for name, value in kwargs.items()
+                if name not in inputs and name not in exclude
+            }
+            key = cache.key(f.__name__, [kwargs[name] for name in inputs], options)
+
+            if not refresh and cache.get(key, output_paths):
+                click.echo(f"Cache hit: {key[:12]}", err=True)
+                return None
+
+            click.echo(f"Cache miss: {key[:12]}", err=True)
+            result = f(**kwargs)
+            cache.put(key, output_paths)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,89 @@
+import importlib
+from typing import Optional
+
+import click
+
+from rii.logging_config import setup_logging
+
+# Subcommand name -> (module:command, short help). Modules are imported only
+# when their subcommand is invoked, so `rii --help` and any subcommand do not
+# pay for pandas/altair/etc. of the others. Command modules themselves import
+# heavy dependencies in function bodies, so `<command> --help` stays fast too.
+COMMANDS: dict[str, tuple[str, str]] = {
+    "extract-metadata": (
+        "rii.extract_metadata:extract_metadata",
+        "Extract, filter and enrich metadata from GISAID metadata dump.",
+    ),
+    "extract-sequences": (
+        "rii.extract_sequences:extract_sequences",
+        "Extract sequences for metadata extract records from GISAID sequences dump.",
+    ),
+    "extract-registry": (
+        "rii.registry.cli:extract",
+        "Extract data from registry excel file to tsv.",
+    ),
+    "join-registry": (
+        "rii.registry.cli:join",
+        "Join registry tsv with GISAID metadata by normalized lab ID.",
+    ),
+    "mutation-profile": (
+        "rii.mutation_profile:mutation_profile",
+        "Export lineage x AA substitution frequency matrix.",
+    ),
+    "plot-pango-bar": (
+        "rii.plots.plot_pango_bar:plot_pango_bar",
+        "Plot lineage proportions by time.",
+    ),
+    "plot-variant-region-proportion": (
+        "rii.plots.plot_variant_region_proportion:plot_variant_region_proportion",
+        "Plot lineage proportions and sequencing volume by time and region.",
+    ),
+    "plot-spike-substitutions": (
+        "rii.plots.plot_spike_substitutions:plot_spike_substitutions",
+        "Plot Spike substitutions frequencies by lineage.",
+    ),
+    "plot-time-spike-substitutions": (
+        "rii.plots.plot_time_spike_substitutions:plot_time_spike_substitutions",
+        "Plot Spike substitutions frequencies by time.",
+    ),
+    "plot-growth-advantage": (
+        "rii.plots.plot_growth_advantage:plot_growth_advantage",
+        "Estimate lineage growth advantage per region.",
+    ),
+    "serve-metadata": (
+        "rii.service:serve_metadata",
+        "Serve plots and tables for metadata kept in memory.",
+    ),
+    "vgarus": ("rii.vgarus.cli:vgarus", "Upload sequences and metadata to VGARUS."),
+}
+
+
+class LazyGroup(click.Group):
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted(COMMANDS)
+
+    def get_command(self, ctx: click.Context, name: str) -> Optional[click.Command]:
+        if name not in COMMANDS:
+            name = name.replace("_", "-")
+        if name not in COMMANDS:
+            return None
+        module_name, command_name = COMMANDS[name][0].split(":")
+        return getattr(importlib.import_module(module_name), command_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter):
+        # Short help is static to avoid importing every subcommand module
+        with formatter.section("Commands"):
+            formatter.write_dl(
+                [(name, COMMANDS[name][1]) for name in self.list_commands(ctx)]
+            )
+
+
+@click.group(cls=LazyGroup)
+def rii() -> None:
+    """Scripts for RII: GISAID metadata and sequences extraction, plots, VGARUS upload."""
+
+    setup_logging()
+
+
+if __name__ == "__main__":
+    rii()
@@ -1,19 +1,26 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from __future__ import annotations
+
+import secrets
+from contextlib import ExitStack
 from datetime import date
 from pathlib import Path
-from typing import Literal, Optional
+from typing import TYPE_CHECKING, Literal, Optional
 
 import click
-import pandas as pd
-from tqdm import tqdm
 
-from rii.gisaid import combine_pango, iter_metadata, make_query
+from rii.cache import cached_command
 from rii.helpers import parse_date_to_week
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 def enrich_df(df: pd.DataFrame) -> pd.DataFrame:
+    from rii.gisaid import combine_pango
+
     # Extract ISO
     df["ISO"] = df["Virus name"].str.extract(r"Russia/([A-Z]{1,3})-", expand=True)
     df.loc[df["Location"].str.contains("Crimea"), "ISO"] = "Crimea"
@@ -37,6 +44,20 @@ def enrich_df(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def output_path_for(
+    output: Optional[str], compress: Optional[str], format: str = "tsv"
+) -> Path:
+    output_path_items = []
+    if output:
+        output_path_items.append(output)
+    else:
+        output_path_items.append(f"metadata-{date.today()}")
+    output_path_items.append(f".{format}")
+    if compress and format == "tsv":
+        output_path_items.append(f".{compress}")
+    return Path("".join(output_path_items))
+
+
 @click.command()
 @click.argument(
     "metadata",
@@ -51,6 +72,43 @@ def enrich_df(df: pd.DataFrame) -> pd.DataFrame:
 @click.option("--output", "-o", help="Output basename")
 @click.option("--enrich", "-e", is_flag=True, help="Add computed columns")
 @click.option("--compress", "-c", type=click.Choice(["gz", "xz"]))
+@click.option(
+    "--format",
+    type=click.Choice(["tsv", "xlsx"]),
+    default="tsv",
+    show_default=True,
+    help="xlsx is split into sheets past Excel row limit, not compressed",
+)
+@click.option(
+    "--processes",
+    "-j",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Parse uncompressed .tsv in parallel",
+)
+@click.option(
+    "--sample",
+    type=click.IntRange(min=1),
+    help="Keep random sample of N records per stratum, adds Sampling weight column",
+)
+@click.option(
+    "--stratify",
+    default="ISO,Collection week",
+    show_default=True,
+    help="Comma separated sampling strata columns (ISO and weeks need --enrich)",
+)
+@click.option(
+    "--seed", type=int, help="Sampling random seed, random and not cached if unset"
+)
+@cached_command(
+    inputs=("metadata",),
+    outputs=lambda params: [
+        output_path_for(params["output"], params["compress"], params["format"])
+    ],
+    exclude=("output", "processes"),
+    cacheable=lambda params: not params["sample"] or params["seed"] is not None,
+)
 def extract_metadata(
     metadata: Path,
     location: tuple[str],
@@ -58,39 +116,80 @@ def extract_metadata(
     output: Optional[str],
     enrich: bool,
     compress: Optional[Literal["gz", "xz"]],
+    format: Literal["tsv", "xlsx"],
+    processes: int,
+    sample: Optional[int],
+    stratify: str,
+    seed: Optional[int],
 ) -> None:
     """Extract, filter and enrich metadata from GISAID metadata dump (.tar.xz achive or .tsv)."""
 
+    from tqdm import tqdm
+
+    from rii.gisaid import iter_metadata, make_query
+    from rii.sampling import StratifiedReservoir
+    from rii.xlsx import XlsxStreamWriter
+
     query = make_query(location=location, pango_lineage=pango_lineage)
 
-    output_path_items = []
-    if output:
-        output_path_items.append(output)
-    else:
-        output_path_items.append(f"metadata-{date.today()}")
-    output_path_items.append(".tsv")
-    if compress:
-        output_path_items.append(f".{compress}")
-    output_path = Path("".join(output_path_items))
+    output_path = output_path_for(output, compress, format)
     output_path.unlink(missing_ok=True)
 
+    sampler = None
+    if sample is not None:
+        if seed is None:
+            seed = secrets.randbelow(2**32)
+            click.echo(f"Sampling seed: {seed}", err=True)
+        sampler = StratifiedReservoir(
+            sample, [column.strip() for column in stratify.split(",")], seed=seed
+        )
+
     filtered_count = 0
-    with tqdm(desc="Processing") as progress:
-        for i, chunk in enumerate(iter_metadata(metadata)):
+    with ExitStack() as stack:
+        progress = stack.enter_context(tqdm(desc="Processing"))
+        xlsx_writer = None
+        if format == "xlsx":
+            xlsx_writer = stack.enter_context(XlsxStreamWriter(output_path))
+
+        def write(df: pd.DataFrame, header: bool) -> None:
+            if xlsx_writer is not None:
+                xlsx_writer.write(df, "Metadata")
+            else:
+                df.to_csv(output_path, sep="\t", index=False, mode="a", header=header)
+
+        for i, chunk in enumerate(iter_metadata(metadata, processes=processes)):
             if enrich:
                 processed_df = enrich_df(chunk)
             else:
                 processed_df = chunk
             if query:
                 processed_df = processed_df.query(query)
+            if sampler is not None and i == 0:
+                missing = set(sampler.stratify) - set(processed_df.columns)
+                if missing:
+                    raise click.UsageError(
+                        f"Strata columns not found: {', '.join(sorted(missing))}"
+                        " (ISO and Collection week need --enrich)"
+                    )
 
             filtered_count += len(processed_df)
-            processed_df.to_csv(
-                output_path, sep="\t", index=False, mode="a", header=(i == 0)
-            )
+            if sampler is not None:
+                sampler.update(processed_df)
+            else:
+                write(processed_df, header=(i == 0))
             progress.set_postfix(filtered=filtered_count)
             progress.update(len(chunk))
 
+        if sampler is not None:
+            sampled_df = sampler.sample()
+            write(sampled_df, header=True)
+            progress.set_postfix(filtered=filtered_count, sampled=len(sampled_df))
+
+    if sampler is not None:
+        click.echo(
+            f"Sampled {len(sampled_df)} of {filtered_count} filtered records", err=True
+        )
+
 
 if __name__ == "__main__":
     extract_metadata()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import click
+
+
+@click.command()
+@click.argument(
+    "metadata",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.argument(
+    "sequences",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--column",
+    default="Virus name",
+    show_default=True,
+    help="Metadata column matching FASTA record names",
+)
+@click.option("--output", "-o", help="Output basename")
+def extract_sequences(
+    metadata: Path,
+    sequences: Path,
+    column: str,
+    output: Optional[str],
+) -> None:
+    """Extract sequences for metadata extract records from GISAID sequences dump (.tar.xz achive or .fasta).
+
+    Archive is decompressed next to itself once, FASTA is indexed once
+    (sqlite <fasta>.idx.db), subsequent runs only look up and read matching
+    records.
+    """
+
+    import pandas as pd
+    from tqdm import tqdm
+
+    from rii.fasta import decompress_fasta, fetch_records, load_or_build_index
+
+    if ".tar" in sequences.suffixes:
+        sequences = decompress_fasta(sequences)
+
+    names = pd.read_csv(metadata, sep="\t", usecols=[column], dtype="string")[
+        column
+    ].dropna()
+
+    index = load_or_build_index(sequences, names)
+
+    output_path = Path(f"{output or f'sequences-{date.today()}'}.fasta")
+
+    found_count = 0
+    with open(output_path, "wb") as fo:
+        for record in tqdm(
+            fetch_records(sequences, index, names), desc="Extracting", unit="seq"
+        ):
+            fo.write(record)
+            found_count += 1
+
+    missing_count = names.nunique() - found_count
+    if missing_count:
+        click.echo(f"Not found in {sequences.name}: {missing_count}", err=True)
+
+
+if __name__ == "__main__":
+    extract_sequences()
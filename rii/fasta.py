@@ -0,0 +1,146 @@
+import mmap
+import shutil
+import sqlite3
+import tarfile
+from pathlib import Path
+from typing import Generator, Iterable, NamedTuple, Optional
+
+INDEX_SUFFIX = ".idx.db"
+
+
+class FastaIndexEntry(NamedTuple):
+    offset: int
+    length: int
+
+
+FastaIndex = dict[str, FastaIndexEntry]
+
+
+def record_name(header: bytes, separator: bytes = b"|") -> str:
+    """Take record name from FASTA header line (without leading '>')."""
+
+    return header.split(separator, 1)[0].strip().decode()
+
+
+def scan_records(
+    fasta: Path, separator: bytes = b"|"
+) -> Generator[tuple[str, int, int], None, None]:
+    """Scan FASTA file once and yield name, byte offset and length of every record.
+
+    Offsets point to the '>' of the header line, lengths span the whole record
+    up to the next header, so a record is copied back as is.
+    """
+
+    with open(fasta, "rb") as fi:
+        if fi.seek(0, 2) == 0:
+            return
+        with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            if mm[:1] == b">":
+                start = 0
+            else:
+                start = mm.find(b"\n>")
+                start = -1 if start == -1 else start + 1
+            while start != -1:
+                header_end = mm.find(b"\n", start)
+                if header_end == -1:
+                    header_end = size
+                next_start = mm.find(b"\n>", header_end)
+                end = size if next_start == -1 else next_start + 1
+                name = record_name(mm[start + 1 : header_end], separator)
+                yield name, start, end - start
+                start = -1 if next_start == -1 else next_start + 1
+
+
+def index_path(fasta: Path) -> Path:
+    return fasta.with_name(fasta.name + INDEX_SUFFIX)
+
+
+def build_index(fasta: Path, path: Path, separator: bytes = b"|") -> None:
+    """Write sqlite index of record offsets keyed by name.
+
+    Only the first occurence of duplicated names is kept. Index is written to
+    a temporary file and moved in place, so an interrupted build is redone.
+    """
+
+    tmp = path.with_name(path.name + ".part")
+    tmp.unlink(missing_ok=True)
+    with sqlite3.connect(tmp) as db:
+        db.execute(
+            "CREATE TABLE records (name TEXT PRIMARY KEY, offset INTEGER, length INTEGER)"
+            " WITHOUT ROWID"
+        )
+        db.executemany(
+            "INSERT OR IGNORE INTO records VALUES (?, ?, ?)",
+            scan_records(fasta, separator),
+        )
+    db.close()
+    tmp.replace(path)
+
+
+def read_index(path: Path, names: Iterable[str]) -> FastaIndex:
+    """Look up only requested names, the index itself is never loaded whole."""
+
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TEMP TABLE requested (name TEXT PRIMARY KEY) WITHOUT ROWID")
+        db.executemany(
+            "INSERT OR IGNORE INTO requested VALUES (?)", ((name,) for name in names)
+        )
+        rows = db.execute(
+            "SELECT records.name, offset, length"
+            " FROM requested JOIN records ON records.name = requested.name"
+        ).fetchall()
+    db.close()
+    return {name: FastaIndexEntry(offset, length) for name, offset, length in rows}
+
+
+def load_or_build_index(
+    fasta: Path, names: Iterable[str], separator: bytes = b"|"
+) -> FastaIndex:
+    """Look up names in index next to FASTA file, (re)building it if missing or outdated."""
+
+    path = index_path(fasta)
+    if not path.exists() or path.stat().st_mtime < fasta.stat().st_mtime:
+        build_index(fasta, path, separator=separator)
+    return read_index(path, names)
+
+
+def decompress_fasta(
+    archive: Path, tar_member: str = "sequences.fasta", dest: Optional[Path] = None
+) -> Path:
+    """Extract FASTA member from GISAID .tar.xz archive once, reuse it afterwards.
+
+    Default destination is named after the archive (<archive>.tar.xz ->
+    <archive>.fasta), so dumps sharing a directory do not reuse each other.
+    """
+
+    if dest is None:
+        stem = archive.name.split(".tar", 1)[0]
+        dest = archive.with_name(f"{stem}.fasta")
+    if dest.exists() and dest.stat().st_mtime >= archive.stat().st_mtime:
+        return dest
+
+    tmp = dest.with_name(dest.name + ".part")
+    with tarfile.open(archive) as tar:
+        fasta_file = tar.extractfile(tar_member)
+        if fasta_file is None:
+            raise ValueError(tar_member)
+        with open(tmp, "wb") as fo:
+            shutil.copyfileobj(fasta_file, fo, length=16 * 1024 * 1024)
+    tmp.replace(dest)
+    return dest
+
+
+def fetch_records(
+    fasta: Path, index: FastaIndex, names: Iterable[str]
+) -> Generator[bytes, None, None]:
+    """Yield raw records for names found in index, in file order."""
+
+    entries = sorted({index[name] for name in names if name in index})
+    if not entries:
+        return
+    with open(fasta, "rb") as fi:
+        with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset, length in entries:
+                record = mm[offset : offset + length]
+                yield record if record.endswith(b"\n") else record + b"\n"
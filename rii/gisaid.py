@@ -8,7 +8,8 @@ from typing import Generator, Iterable, Optional
 
 import pandas as pd
 
-from rii.loaders import iter_chunks_from_tar_or_csv
+from rii.helpers import SAMPLING_WEIGHT, group_counts
+from rii.loaders import iter_chunks_from_csv_sharded, iter_chunks_from_tar_or_csv
 
 aa_substitution_pattern = (
     r"(?P<gene>[A-Za-z\d]+)_(?P<ref>[A-Za-z]+)(?P<pos>\d+)(?P<seq>[A-Za-z]+)"
@@ -37,8 +38,15 @@ METADATA_DTYPES = defaultdict(
 
 
 def iter_metadata(
-    file: Path, chunksize: int = 100_000
+    file: Path, chunksize: int = 100_000, processes: int = 1
 ) -> Generator[pd.DataFrame, None, None]:
+    """Iterate metadata chunks, uncompressed .tsv is parsed in parallel if processes > 1."""
+
+    if processes > 1 and file.suffixes[-1:] == [".tsv"]:
+        yield from iter_chunks_from_csv_sharded(
+            file, processes=processes, sep="\t", dtype=METADATA_DTYPES
+        )
+        return
     yield from iter_chunks_from_tar_or_csv(
         file,
         tar_member="metadata.tsv",
@@ -85,3 +93,40 @@ def combine_pango(pango: pd.Series) -> pd.Series:
         combined[idx] = combo
 
     return combined
+
+
+def count_substitutions(df: pd.DataFrame, group_column: str) -> pd.DataFrame:
+    """Count AA substitutions of all genes per group in one pass.
+
+    Returns sparse group x mutation table in long form with counts and
+    frequencies relative to group size.
+    """
+
+    df = df.reset_index(drop=True)
+    totals = group_counts(df, group_column)
+
+    subs = df["AA Substitutions"].str.strip("()").str.split(",").explode().dropna()
+    subs = subs[subs.str.len() > 0]
+    pairs = {
+        group_column: df[group_column].to_numpy()[subs.index.to_numpy()],
+        "mutation": subs.to_numpy(),
+    }
+    if SAMPLING_WEIGHT in df.columns:
+        pairs[SAMPLING_WEIGHT] = df[SAMPLING_WEIGHT].to_numpy()[subs.index.to_numpy()]
+    counts = (
+        group_counts(pd.DataFrame(pairs), [group_column, "mutation"])
+        .to_frame("count")
+        .reset_index()
+    )
+    counts["total"] = counts[group_column].map(totals)
+    counts["frequency"] = counts["count"] / counts["total"]
+
+    mutations = pd.Series(counts["mutation"].unique(), dtype="string")
+    parts = mutations.str.extract(aa_substitution_pattern)
+    parts["pos"] = pd.to_numeric(parts["pos"]).astype("Int32")
+    parts["mutation"] = mutations
+
+    return counts.merge(parts, on="mutation", how="left")[
+        [group_column, "mutation", "gene", "ref", "pos", "seq"]
+        + ["count", "total", "frequency"]
+    ]
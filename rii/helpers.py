@@ -1,7 +1,20 @@
+from __future__ import annotations
+
 from datetime import date, datetime
-from typing import Optional, Union
+from typing import TYPE_CHECKING, Optional, Union
+
+# pandas is only needed for annotations, so command modules importing
+# constants from here stay cheap to import
+if TYPE_CHECKING:
+    import pandas as pd
+
+STEP_TO_COLUMN = {
+    "day": "Collection date",
+    "week": "Collection week",
+    "month": "Collection month",
+}
 
-import pandas as pd
+SAMPLING_WEIGHT = "Sampling weight"
 
 
 def parse_date_to_week(value: Union[str, date, datetime]) -> str:
@@ -20,10 +33,31 @@ def parse_date_to_week(value: Union[str, date, datetime]) -> str:
         return ""
 
 
+def group_counts(df: pd.DataFrame, by: Union[str, list[str]]) -> pd.Series:
+    """Records count per group, sum of sampling weights for sampled extracts.
+
+    Only observed groups are counted, categorical keys (e.g. in serve_metadata)
+    would otherwise give every combination of categories.
+    """
+
+    if SAMPLING_WEIGHT in df.columns:
+        return df.groupby(by, observed=True)[SAMPLING_WEIGHT].sum()
+    return df.groupby(by, observed=True).size()
+
+
+def total_count(df: pd.DataFrame) -> float:
+    if SAMPLING_WEIGHT in df.columns:
+        return df[SAMPLING_WEIGHT].sum()
+    return len(df)
+
+
 def count_frequency(
     df: pd.DataFrame, column: str, groupby: Optional[list[str]] = None
 ) -> pd.DataFrame:
-    """Calculate grouped or not counts, frequencies and cum frequencies."""
+    """Calculate grouped or not counts, frequencies and cum frequencies.
+
+    Counts are weighted if df has sampling weights column.
+    """
 
     groupby = groupby or []
 
@@ -36,20 +70,19 @@ def count_frequency(
 
     if groupby:
         group_totals = (
-            df.groupby(groupby).size().to_frame(total_column_name).reset_index()
+            group_counts(df, groupby).to_frame(total_column_name).reset_index()
         )
 
         group_column_counts = (
-            df.groupby(groupby + [column])
-            .size()
+            group_counts(df, groupby + [column])
             .to_frame(count_column_name)
             .reset_index()
         )
 
         result_df = group_totals.merge(group_column_counts, on=groupby, how="left")
     else:
-        result_df = df.groupby(column).size().to_frame(count_column_name).reset_index()
-        result_df[total_column_name] = len(df)
+        result_df = group_counts(df, column).to_frame(count_column_name).reset_index()
+        result_df[total_column_name] = total_count(df)
 
     result_df[frequency_column_name] = (
         result_df[count_column_name] / result_df[total_column_name]
@@ -62,7 +95,7 @@ def count_frequency(
     )
 
     if groupby:
-        result_df[cumfreq_column_name] = result_df.groupby(groupby)[
+        result_df[cumfreq_column_name] = result_df.groupby(groupby, observed=True)[
             frequency_column_name
         ].cumsum()
     else:
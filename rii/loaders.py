@@ -1,4 +1,9 @@
+import io
+import mmap
+import os
 import tarfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Generator, Optional
 
@@ -19,3 +24,100 @@ def iter_chunks_from_tar_or_csv(
         yield from pd.read_csv(file, iterator=True, **kwargs)
     else:
         raise ValueError(file.suffixes)
+
+
+def _closing_quote(mm: mmap.mmap, pos: int, quotechar: bytes) -> int:
+    """Position of quote char closing quoted field from pos, doubled quotes are escapes."""
+
+    while True:
+        pos = mm.find(quotechar, pos)
+        if pos == -1 or mm[pos + 1 : pos + 2] != quotechar:
+            return pos
+        pos += 2
+
+
+def split_line_aligned(
+    mm: mmap.mmap,
+    start: int,
+    shard_size: int,
+    delimiter: bytes = b",",
+    quotechar: bytes = b'"',
+) -> list[tuple[int, int]]:
+    """Split mmapped file from start into byte ranges of about shard_size ending on record boundaries.
+
+    A newline is a record boundary unless it is inside a quoted field. As in
+    pandas, a field is quoted only if it starts with quote char, quote chars
+    elsewhere in a field are literal and doubled ones inside quoted field are
+    escaped, so a stray quote does not shift boundaries for the rest of file.
+    """
+
+    size = len(mm)
+    field_starts = (delimiter, b"\n")
+    ranges = []
+    while start < size:
+        end = min(start + shard_size, size)
+        # Ranges start on record boundary, pos is always outside quoted fields
+        pos = start
+        while end < size:
+            newline = mm.find(b"\n", max(end, pos))
+            if newline == -1:
+                end = size
+                break
+            quote = mm.find(quotechar, pos, newline)
+            if quote == -1:
+                end = newline + 1
+                break
+            pos = quote + 1
+            if quote > start and mm[quote - 1 : quote] not in field_starts:
+                continue
+            close = _closing_quote(mm, pos, quotechar)
+            if close == -1:
+                end = size
+                break
+            pos = close + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _read_csv_range(
+    file: Path, header: bytes, start: int, end: int, kwargs: dict
+) -> pd.DataFrame:
+    with open(file, "rb") as fi:
+        with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = header + mm[start:end]
+    return pd.read_csv(io.BytesIO(data), **kwargs)
+
+
+def iter_chunks_from_csv_sharded(
+    file: Path,
+    processes: Optional[int] = None,
+    shard_size: int = 64 * 1024 * 1024,
+    **kwargs,
+) -> Generator[pd.DataFrame, None, None]:
+    """Parse uncompressed csv/tsv in line-aligned byte ranges in separate processes.
+
+    Chunks are yielded in file order, at most 2 * processes ranges are parsed
+    ahead of the consumer.
+    """
+
+    processes = processes or os.cpu_count() or 1
+    with open(file, "rb") as fi:
+        if fi.seek(0, 2) == 0:
+            return
+        with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b"\n") + 1 or len(mm)
+            header = mm[:header_end]
+            delimiter = kwargs.get("sep", ",").encode()
+            ranges = split_line_aligned(mm, header_end, shard_size, delimiter)
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending: deque = deque()
+        for start, end in ranges:
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+            pending.append(
+                executor.submit(_read_csv_range, file, header, start, end, kwargs)
+            )
+        while pending:
+            yield pending.popleft().result()
@@ -1,3 +1,5 @@
+import logging.config
+
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 LOGGING_CONFIG = {
@@ -18,6 +20,7 @@ LOGGING_CONFIG = {
             "formatter": "verbose",
             "class": "logging.FileHandler",
             "filename": "vgarus.log",
+            "delay": True,
         },
     },
     "loggers": {
@@ -36,3 +39,15 @@ LOGGING_CONFIG = {
         "handlers": ["console"],
     },
 }
+
+
+_configured = False
+
+
+def setup_logging() -> None:
+    """Apply LOGGING_CONFIG once, called by commands instead of on package import."""
+
+    global _configured
+    if not _configured:
+        logging.config.dictConfig(LOGGING_CONFIG)
+        _configured = True
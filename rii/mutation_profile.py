@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import fnmatch
+from pathlib import Path
+from typing import Literal
+
+import click
+
+from rii.helpers import SAMPLING_WEIGHT
+
+
+@click.command()
+@click.argument(
+    "metadata",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=True,
+)
+@click.option(
+    "--pango-lineage",
+    "-p",
+    help="Lineage filter, unix filename-like patterns allowed, can use mupliple flags",
+    multiple=True,
+)
+@click.option("--combine", is_flag=True, help="Group lineages with combine_pango")
+@click.option(
+    "--defining-cutoff",
+    type=float,
+    default=0.75,
+    show_default=True,
+    help="Frequency to report mutation as lineage-defining",
+)
+@click.option(
+    "--output",
+    "-o",
+    help="Output basename",
+    default="mutation_profile",
+    show_default=True,
+)
+@click.option(
+    "--format",
+    type=click.Choice(["tsv", "parquet"]),
+    default="tsv",
+    show_default=True,
+)
+def mutation_profile(
+    metadata: Path,
+    pango_lineage: tuple[str],
+    combine: bool,
+    defining_cutoff: float,
+    output: str = "mutation_profile",
+    format: Literal["tsv", "parquet"] = "tsv",
+) -> None:
+    """Export lineage x AA substitution frequency matrix for all genes and lineage-defining mutations."""
+
+    import pandas as pd
+
+    from rii.gisaid import combine_pango, count_substitutions
+
+    metadata_df = pd.read_csv(
+        metadata,
+        sep="\t",
+        usecols=lambda column: column
+        in ["AA Substitutions", "Pango lineage", SAMPLING_WEIGHT],
+    )
+
+    if pango_lineage:
+        pango_regex = "|".join(fnmatch.translate(pl) for pl in pango_lineage)
+        metadata_df = metadata_df[
+            metadata_df["Pango lineage"].str.fullmatch(pango_regex, na=False)
+        ]
+
+    group_column = "Pango lineage"
+    if combine:
+        group_column = "Pango lineage combo"
+        metadata_df[group_column] = combine_pango(metadata_df["Pango lineage"])
+
+    profile = count_substitutions(metadata_df, group_column)
+    defining = profile[profile["frequency"].ge(defining_cutoff)].sort_values(
+        [group_column, "gene", "pos"]
+    )
+
+    if format == "parquet":
+        profile.to_parquet(f"{output}.parquet", index=False)
+        defining.to_parquet(f"{output}.defining.parquet", index=False)
+    else:
+        profile.to_csv(f"{output}.tsv", sep="\t", index=False)
+        defining.to_csv(f"{output}.defining.tsv", sep="\t", index=False)
+
+
+if __name__ == "__main__":
+    mutation_profile()
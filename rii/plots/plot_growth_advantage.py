@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import warnings
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, Optional
+
+import click
+
+from rii.cache import cached_command
+from rii.helpers import SAMPLING_WEIGHT, group_counts
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+OTHER = "Другое"
+
+
+def count_array(
+    df: pd.DataFrame, lineages: list[str]
+) -> tuple[np.ndarray, list[str], pd.DatetimeIndex]:
+    """Build dense ISO x week x lineage counts, weeks are a continuous range.
+
+    Sampled records are weighted, with weights summing to sample size per region.
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    week_start = pd.to_datetime(
+        df["Collection week"] + "-1", format="%G-W%V-%u", errors="coerce"
+    )
+    df = df.assign(week_start=week_start).dropna(subset=["ISO", "week_start"])
+
+    regions = pd.Categorical(df["ISO"])
+    lineage_codes = pd.Categorical(df["Pango lineage prepared"], categories=lineages)
+    weeks = pd.date_range(df["week_start"].min(), df["week_start"].max(), freq="7D")
+    week_codes = ((df["week_start"] - weeks[0]).dt.days // 7).to_numpy()
+
+    shape = (len(regions.categories), len(weeks), len(lineages))
+    flat = np.ravel_multi_index((regions.codes, week_codes, lineage_codes.codes), shape)
+    weights = None
+    if SAMPLING_WEIGHT in df.columns:
+        # Weights restore population proportions, but are rescaled to sum to
+        # sampled records per region, so standard errors reflect the sample.
+        region_weights = df.groupby("ISO")[SAMPLING_WEIGHT]
+        weights = (
+            df[SAMPLING_WEIGHT]
+            * region_weights.transform("size")
+            / region_weights.transform("sum")
+        ).to_numpy()
+    counts = np.bincount(flat, weights=weights, minlength=np.prod(shape)).reshape(shape)
+
+    return counts.astype(float), list(regions.categories), weeks
+
+
+def fit_multinomial_growth(
+    counts: np.ndarray, ridge: float = 1e-4, max_iter: int = 50, tol: float = 1e-8
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fit log p_k / p_0 = a_k + b_k t for all regions at once by Newton iterations.
+
+    counts has shape (regions, weeks, lineages), lineage 0 is the reference.
+    Returns growth rates b (regions, lineages - 1) per week and their standard
+    errors. Small ridge penalty keeps estimates finite for absent lineages.
+    """
+
+    import numpy as np
+
+    n_regions, n_weeks, n_lineages = counts.shape
+    k = n_lineages - 1
+    # Time is centered and scaled to unit range for conditioning,
+    # rates are scaled back to per week at the end.
+    scale = max(n_weeks - 1, 1)
+    t = (np.arange(n_weeks) - (n_weeks - 1) / 2) / scale
+    totals = counts.sum(axis=2)  # (R, T)
+    observed = counts[:, :, 1:]
+    ridge_eye = ridge * np.eye(2 * k)
+
+    a = np.zeros((n_regions, k))
+    b = np.zeros((n_regions, k))
+    for _ in range(max_iter):
+        eta = a[:, None, :] + b[:, None, :] * t[None, :, None]  # (R, T, K-1)
+        eta_max = np.maximum(eta.max(axis=2, keepdims=True), 0)
+        p = np.exp(eta - eta_max)
+        p /= np.exp(-eta_max) + p.sum(axis=2, keepdims=True)
+
+        residuals = observed - totals[:, :, None] * p
+        grad = np.concatenate(
+            [
+                residuals.sum(axis=1) - ridge * a,
+                np.einsum("rtk,t->rk", residuals, t) - ridge * b,
+            ],
+            axis=1,
+        )
+
+        # Hessian blocks of sum_t n_t (diag(p_t) - p_t p_t^T) x_t x_t^T
+        weights = -np.einsum("rtk,rtl->rtkl", totals[:, :, None] * p, p)
+        diagonal = np.einsum("rtkk->rtk", weights)
+        diagonal += totals[:, :, None] * p
+        h00 = weights.sum(axis=1)
+        h01 = np.einsum("rtkl,t->rkl", weights, t)
+        h11 = np.einsum("rtkl,t->rkl", weights, t**2)
+        hessian = np.block([[h00, h01], [h01, h11]]) + ridge_eye
+
+        step = np.linalg.solve(hessian, grad[:, :, None])[:, :, 0]
+        # Damp large steps, log-likelihood is concave but far from optimum
+        # (e.g. absent lineages) full Newton steps overshoot.
+        step_size = np.abs(step).max(axis=1, keepdims=True)
+        step *= np.minimum(1, 5 / np.maximum(step_size, 1e-12))
+        a += step[:, :k]
+        b += step[:, k:]
+        if step_size.max() < tol:
+            break
+
+    covariance = np.linalg.inv(hessian)
+    se = np.sqrt(np.diagonal(covariance, axis1=1, axis2=2)[:, k:])
+
+    return b / scale, se / scale
+
+
+@click.command()
+@click.argument(
+    "metadata",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=True,
+)
+@click.option("--time-from", "-f", help="First week, e.g. 2022-W01")
+@click.option("--time-to", "-t", help="Last week, e.g. 2022-W52")
+@click.option(
+    "--top",
+    type=int,
+    default=30,
+    show_default=True,
+    help="Number of most frequent lineage combos to fit, others are merged",
+)
+@click.option("--reference", help="Reference lineage combo, most frequent by default")
+@click.option(
+    "--min-count",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Min lineage and reference counts in region to report estimate",
+)
+@click.option(
+    "--output",
+    "-o",
+    help="Output basename",
+    default="growth_advantage",
+    show_default=True,
+)
+@click.option(
+    "--format", type=click.Choice(["svg", "png"]), default="png", show_default=True
+)
+@click.option("--color-scheme", default="redblue", show_default=True)
+@cached_command(
+    inputs=("metadata",),
+    outputs=lambda params: [
+        Path(f"{params['output']}.tsv"),
+        Path(f"{params['output']}.{params['format']}"),
+    ],
+)
+def plot_growth_advantage(
+    metadata: Path,
+    time_from: Optional[str],
+    time_to: Optional[str],
+    top: int,
+    reference: Optional[str],
+    min_count: int,
+    output: str = "growth_advantage",
+    format: Literal["svg", "png"] = "png",
+    color_scheme: str = "redblue",
+) -> None:
+    """Estimate weekly growth advantage of lineage combos relative to reference per region."""
+
+    import altair as alt
+    import numpy as np
+    import pandas as pd
+
+    df = pd.read_csv(
+        metadata,
+        sep="\t",
+        usecols=lambda column: column
+        in ["ISO", "Collection week", "Pango lineage combo", SAMPLING_WEIGHT],
+    ).dropna()
+
+    # Filtering
+    if time_from is not None:
+        df = df[df["Collection week"].ge(time_from)]
+    if time_to is not None:
+        df = df[df["Collection week"].le(time_to)]
+
+    # Prepare data
+    if df.empty:
+        raise click.UsageError("No records left after filtering")
+    if reference is not None and not df["Pango lineage combo"].eq(reference).any():
+        raise click.BadParameter(
+            f"{reference} is not found in data", param_hint="'--reference'"
+        )
+    frequent = (
+        group_counts(df, "Pango lineage combo")
+        .sort_values(ascending=False)
+        .index[:top]
+        .to_list()
+    )
+    reference = reference or frequent[0]
+    if reference not in frequent:
+        frequent.append(reference)
+    df["Pango lineage prepared"] = df["Pango lineage combo"].where(
+        df["Pango lineage combo"].isin(frequent), OTHER
+    )
+    lineages = [reference] + sorted(set(df["Pango lineage prepared"]) - {reference})
+
+    counts, regions, weeks = count_array(df, lineages)
+
+    # Fitting
+    rate, se = fit_multinomial_growth(counts)
+
+    lineage_totals = counts.sum(axis=1)
+    result = pd.DataFrame(
+        {
+            "ISO": np.repeat(regions, len(lineages) - 1),
+            "Lineage": np.tile(lineages[1:], len(regions)),
+            "Count": lineage_totals[:, 1:].ravel(),
+            "Reference count": np.repeat(lineage_totals[:, 0], len(lineages) - 1),
+            "Growth rate": rate.ravel(),
+            "SE": se.ravel(),
+        }
+    )
+    result["Reference"] = reference
+    result["Growth advantage"] = np.expm1(result["Growth rate"])
+    result["CI low"] = np.expm1(result["Growth rate"] - 1.96 * result["SE"])
+    result["CI high"] = np.expm1(result["Growth rate"] + 1.96 * result["SE"])
+    # Estimates relative to an absent or rare reference are pinned by ridge
+    # penalty only and meaningless
+    result.loc[
+        result["Count"].lt(min_count) | result["Reference count"].lt(min_count),
+        ["Growth rate", "SE", "Growth advantage", "CI low", "CI high"],
+    ] = np.nan
+
+    result.to_csv(f"{output}.tsv", sep="\t", index=False)
+
+    # Plotting
+    alt.data_transformers.disable_max_rows()
+    warnings.simplefilter("ignore")
+    chart = (
+        alt.Chart(result.dropna(subset=["Growth advantage"]))
+        .mark_rect()
+        .encode(
+            x=alt.X("Lineage:N", title="Линия"),
+            y=alt.Y("ISO:N"),
+            color=alt.Color(
+                "Growth advantage:Q",
+                title="Преимущество роста в неделю",
+                scale=alt.Scale(scheme=color_scheme, domainMid=0, reverse=True),
+            ),
+            tooltip=[
+                "ISO",
+                "Lineage",
+                "Count",
+                "Reference count",
+                "Growth advantage",
+                "CI low",
+                "CI high",
+            ],
+        )
+        .properties(
+            title=f"Относительно {reference}, {weeks[0]:%G-W%V} — {weeks[-1]:%G-W%V}"
+        )
+    )
+    output_filename = f"{output}.{format}"
+    chart.save(output_filename)
+
+
+if __name__ == "__main__":
+    plot_growth_advantage()
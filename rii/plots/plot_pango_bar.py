@@ -1,13 +1,88 @@
+from __future__ import annotations
+
 import warnings
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Literal, Optional
 
-import altair as alt
 import click
-import pandas as pd
 
-from rii.gisaid import make_query
-from rii.helpers import count_frequency
+from rii.cache import cached_command
+from rii.helpers import STEP_TO_COLUMN, count_frequency, group_counts
+
+if TYPE_CHECKING:
+    import altair as alt
+    import pandas as pd
+
+
+def prepare_pango_bar(
+    df: pd.DataFrame,
+    frequency_cutoff: float,
+    time_column: str,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+) -> pd.DataFrame:
+    """Filter by time and merge lineage combos below frequency cutoff into 'Другое'."""
+
+    if time_from is not None:
+        df = df[df[time_column].ge(time_from)]
+    if time_to is not None:
+        df = df[df[time_column].le(time_to)]
+
+    frequencies = count_frequency(df, column="Pango lineage combo")
+    selected_lineages = frequencies.loc[
+        frequencies["Pango lineage combo Frequency"].ge(frequency_cutoff),
+        "Pango lineage combo",
+    ].to_list()
+
+    return df.assign(
+        **{
+            "Pango lineage prepared": df["Pango lineage combo"]
+            .where(df["Pango lineage combo"].isin(selected_lineages))
+            .fillna("Другое")
+        }
+    )
+
+
+def pango_bar_chart(df: pd.DataFrame, time_column: str) -> alt.Chart:
+    import altair as alt
+
+    counts = (
+        group_counts(df, [time_column, "Pango lineage prepared"])
+        .to_frame("Count")
+        .reset_index()
+    )
+    return (
+        alt.Chart(counts)
+        .mark_bar()
+        .encode(
+            x=alt.X(f"{time_column}:O", title=None),
+            y=alt.Y("sum(Count)", stack="normalize", title="Доля"),
+            color=alt.Color("Pango lineage prepared:N", title="Линия"),
+        )
+    )
+
+
+def pango_bar_tables(
+    df: pd.DataFrame, time_column: str
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Pivot of stepped lineage frequencies and counts of lineages merged into 'Другое'."""
+
+    stepped_frequencies = count_frequency(
+        df, column="Pango lineage prepared", groupby=[time_column]
+    )
+    pivot = stepped_frequencies.pivot(
+        index=time_column,
+        columns="Pango lineage prepared",
+        values=f"{time_column} Pango lineage prepared Frequency",
+    ).fillna(0)
+    other_counts = (
+        group_counts(
+            df[df["Pango lineage prepared"].eq("Другое")], "Pango lineage combo"
+        )
+        .sort_values(ascending=False)
+        .to_frame("count")
+    )
+    return pivot, other_counts
 
 
 @click.command()
@@ -38,6 +113,14 @@ from rii.helpers import count_frequency
 )
 @click.option("--table", help="Write pivot table", is_flag=True)
 @click.option("--color-scheme", default="reds", show_default=True)
+@cached_command(
+    inputs=("metadata",),
+    outputs=lambda params: [
+        Path(f"{params['output']}.{params['format']}"),
+        *([Path(f"{params['output']}.xlsx")] if params["table"] else []),
+        Path("data.csv"),
+    ],
+)
 def plot_pango_bar(
     metadata: Path,
     frequency_cutoff: float,
@@ -49,69 +132,33 @@ def plot_pango_bar(
     table: bool = False,
     color_scheme: str = "reds",
 ) -> None:
-    metadata_df = pd.read_csv(metadata, sep="\t")
+    import altair as alt
+    import pandas as pd
 
-    # Filtering
-    step_to_column = {
-        "day": "Collection date",
-        "week": "Collection week",
-        "month": "Collection month",
-    }
-    time_column = step_to_column[time_step]
-    df = metadata_df
-    if time_from is not None:
-        df = df[df[time_column].ge(time_from)]
-    if time_to is not None:
-        df = df[df[time_column].le(time_to)]
+    from rii.xlsx import write_xlsx
 
-    # Prepare data
-    frequencies = count_frequency(df, column="Pango lineage combo")
-    selected_lineages = frequencies.loc[
-        frequencies["Pango lineage combo Frequency"].ge(frequency_cutoff),
-        "Pango lineage combo",
-    ].to_list()
+    metadata_df = pd.read_csv(metadata, sep="\t")
 
-    df.loc[
-        df["Pango lineage combo"].isin(selected_lineages), "Pango lineage prepared"
-    ] = df["Pango lineage combo"]
-    df["Pango lineage prepared"].fillna("Другое", inplace=True)
+    # Prepare data
+    time_column = STEP_TO_COLUMN[time_step]
+    df = prepare_pango_bar(
+        metadata_df, frequency_cutoff, time_column, time_from, time_to
+    )
 
     df.to_csv("data.csv", index=False)
 
     # Plotting
     alt.data_transformers.disable_max_rows()
     warnings.simplefilter("ignore")
-    chart = (
-        alt.Chart(df)
-        .mark_bar()
-        .encode(
-            x=alt.X(f"{time_column}:O", title=None),
-            y=alt.Y("count()", stack="normalize", title="Доля"),
-            color=alt.Color("Pango lineage prepared:N", title="Линия"),
-        )
-    )
+    chart = pango_bar_chart(df, time_column)
 
     output_filename = f"{output}.{format}"
     chart.save(output_filename)
 
     if table:
-        stepped_frequencies = count_frequency(
-            df, column="Pango lineage prepared", groupby=[time_column]
-        )
-        pivot = stepped_frequencies.pivot(
-            index=time_column,
-            columns="Pango lineage prepared",
-            values=f"{time_column} Pango lineage prepared Frequency",
-        ).fillna(0)
-        other_counts = (
-            df.loc[df["Pango lineage prepared"].eq("Другое"), "Pango lineage combo"]
-            .value_counts()
-            .to_frame()
-        )
+        pivot, other_counts = pango_bar_tables(df, time_column)
 
-        with pd.ExcelWriter(f"{output}.xlsx") as writer:
-            pivot.to_excel(writer, sheet_name="Pivot")
-            other_counts.to_excel(writer, sheet_name="Other")
+        write_xlsx(Path(f"{output}.xlsx"), {"Pivot": pivot, "Other": other_counts})
 
 
 if __name__ == "__main__":
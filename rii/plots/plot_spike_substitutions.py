@@ -1,50 +1,31 @@
+from __future__ import annotations
+
 import fnmatch
 import warnings
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
-import altair as alt
 import click
-import pandas as pd
 
-from rii.gisaid import aa_substitution_pattern
+from rii.cache import cached_command
+from rii.helpers import SAMPLING_WEIGHT, group_counts, total_count
 
+if TYPE_CHECKING:
+    import altair as alt
+    import pandas as pd
 
-@click.command()
-@click.argument(
-    "metadata",
-    type=click.Path(exists=True, dir_okay=False, path_type=Path),
-    required=True,
-)
-@click.option(
-    "--pango-lineage",
-    "-p",
-    help="Lineage filter, unix filename-like patterns allowed, can use mupliple flags",
-    multiple=True,
-)
-@click.option(
-    "--output",
-    "-o",
-    help="Output basename",
-    default="spike_substitutions",
-    show_default=True,
-)
-@click.option(
-    "--format", type=click.Choice(["svg", "png"]), default="png", show_default=True
-)
-def plot_spike_substitutions(
-    metadata: Path,
-    pango_lineage: tuple[str],
-    output: str = "spike_substitutions",
-    format: Literal["svg", "png"] = "png",
-) -> None:
-    metadata_df = pd.read_csv(
-        metadata,
-        sep="\t",
-        usecols=["Accession ID", "AA Substitutions", "Pango lineage"],
-    ).set_index("Accession ID")
 
-    # Preparing
+def spike_substitutions(
+    metadata_df: pd.DataFrame, pango_lineage: tuple[str, ...]
+) -> pd.DataFrame:
+    """Spike substitutions proportions per lineage pattern.
+
+    metadata_df is indexed by Accession ID.
+    """
+
+    import pandas as pd
+
+    from rii.gisaid import aa_substitution_pattern
 
     lines_dfs = []
     for line in pango_lineage:
@@ -64,21 +45,26 @@ def plot_spike_substitutions(
             .drop(columns=["match", "gene"])
         )
 
-        total_recs = len(line_extract_df)
+        if SAMPLING_WEIGHT in line_extract_df.columns:
+            spike_subs_df = spike_subs_df.join(
+                line_extract_df[SAMPLING_WEIGHT], on="Accession ID"
+            )
+
+        total_recs = total_count(line_extract_df)
         subs_count_df = (
-            spike_subs_df.groupby(["pos", "seq"])["Accession ID"]
-            .agg("count")
-            .to_frame("count")
-            .reset_index()
+            group_counts(spike_subs_df, ["pos", "seq"]).to_frame("count").reset_index()
         )
         subs_count_df["proportion"] = subs_count_df["count"] / total_recs
         subs_count_df["line"] = line
         lines_dfs.append(subs_count_df)
 
-    data = pd.concat(lines_dfs, ignore_index=True)
+    return pd.concat(lines_dfs, ignore_index=True)
 
-    warnings.simplefilter("ignore")
-    chart = (
+
+def spike_substitutions_chart(data: pd.DataFrame) -> alt.Chart:
+    import altair as alt
+
+    return (
         alt.Chart(data)
         .mark_bar()
         .encode(
@@ -88,6 +74,53 @@ def plot_spike_substitutions(
             color=alt.Color("seq:N", title=None, scale=alt.Scale(scheme="tableau20")),
         )
     )
+
+
+@click.command()
+@click.argument(
+    "metadata",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=True,
+)
+@click.option(
+    "--pango-lineage",
+    "-p",
+    help="Lineage filter, unix filename-like patterns allowed, can use mupliple flags",
+    multiple=True,
+)
+@click.option(
+    "--output",
+    "-o",
+    help="Output basename",
+    default="spike_substitutions",
+    show_default=True,
+)
+@click.option(
+    "--format", type=click.Choice(["svg", "png"]), default="png", show_default=True
+)
+@cached_command(
+    inputs=("metadata",),
+    outputs=lambda params: [Path(f"{params['output']}.{params['format']}")],
+)
+def plot_spike_substitutions(
+    metadata: Path,
+    pango_lineage: tuple[str],
+    output: str = "spike_substitutions",
+    format: Literal["svg", "png"] = "png",
+) -> None:
+    import pandas as pd
+
+    metadata_df = pd.read_csv(
+        metadata,
+        sep="\t",
+        usecols=lambda column: column
+        in ["Accession ID", "AA Substitutions", "Pango lineage", SAMPLING_WEIGHT],
+    ).set_index("Accession ID")
+
+    data = spike_substitutions(metadata_df, pango_lineage)
+
+    warnings.simplefilter("ignore")
+    chart = spike_substitutions_chart(data)
     output_filename = f"{output}.{format}"
     chart.save(output_filename)
 
@@ -5,9 +5,10 @@ from operator import or_
 from pathlib import Path
 from typing import Literal
 
-import altair as alt
 import click
-import pandas as pd
+
+from rii.cache import cached_command
+from rii.helpers import SAMPLING_WEIGHT, group_counts, total_count
 
 
 @click.command()
@@ -42,6 +43,10 @@ import pandas as pd
 @click.option(
     "--format", type=click.Choice(["svg", "png"]), default="png", show_default=True
 )
+@cached_command(
+    inputs=("metadata",),
+    outputs=lambda params: [Path(f"{params['output']}.{params['format']}")],
+)
 def plot_time_spike_substitutions(
     metadata: Path,
     pango_lineage: tuple[str],
@@ -52,16 +57,21 @@ def plot_time_spike_substitutions(
     output: str = "time_spike_substitutions",
     format: Literal["svg", "png"] = "png",
 ) -> None:
+    import altair as alt
+    import pandas as pd
+
     metadata_df = pd.read_csv(
         metadata,
         sep="\t",
-        usecols=[
+        usecols=lambda column: column
+        in [
             "Accession ID",
             "AA Substitutions",
             "Collection date",
             "Collection week",
             "Collection month",
             "Pango lineage",
+            SAMPLING_WEIGHT,
         ],
     ).set_index("Accession ID")
 
@@ -97,24 +107,30 @@ def plot_time_spike_substitutions(
         .drop(columns=["match"])
     )
 
-    aa_freq = spike_subs_df["aa_sub"].value_counts().to_frame("count") / len(
+    if SAMPLING_WEIGHT in metadata_df.columns:
+        spike_subs_df = spike_subs_df.join(
+            metadata_df[SAMPLING_WEIGHT], on="Accession ID"
+        )
+
+    aa_freq = group_counts(spike_subs_df, "aa_sub").to_frame("count") / total_count(
         metadata_df
     )
     selected_aa_subs = list(aa_freq[aa_freq >= frequency_cutoff].dropna().index)
     meta_aa_df = metadata_df.merge(
-        spike_subs_df[spike_subs_df["aa_sub"].isin(selected_aa_subs)],
+        spike_subs_df.loc[
+            spike_subs_df["aa_sub"].isin(selected_aa_subs), ["Accession ID", "aa_sub"]
+        ],
         left_index=True,
         right_on="Accession ID",
     )
 
     aa_count_df = (
-        meta_aa_df.groupby([time_column, "aa_sub"])["Accession ID"]
-        .agg("count")
+        group_counts(meta_aa_df, [time_column, "aa_sub"])
         .to_frame("count")
         .reset_index()
     )
     meta_count_df = (
-        metadata_df.groupby(time_column).size().to_frame("total").reset_index()
+        group_counts(metadata_df, time_column).to_frame("total").reset_index()
     )
     meta_aa_count_df = meta_count_df.merge(aa_count_df, on=time_column)
     meta_aa_count_df["freq"] = meta_aa_count_df["count"] / meta_aa_count_df["total"]
@@ -1,12 +1,96 @@
+from __future__ import annotations
+
 import warnings
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Literal, Optional
 
-import altair as alt
 import click
-import pandas as pd
 
-from rii.gisaid import make_query
+from rii.cache import cached_command
+from rii.helpers import STEP_TO_COLUMN, group_counts
+
+if TYPE_CHECKING:
+    import altair as alt
+    import pandas as pd
+
+
+def variant_region_proportion(
+    df: pd.DataFrame,
+    pango_lineage: tuple[str, ...],
+    time_column: str,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    time_clip: bool = False,
+    rii_only: bool = False,
+) -> pd.DataFrame:
+    """Sequencing volume and selected lineages proportion per ISO and time step."""
+
+    from rii.gisaid import make_query
+
+    if time_from is not None:
+        df = df[df[time_column].ge(time_from)]
+    if time_to is not None:
+        df = df[df[time_column].le(time_to)]
+    if rii_only:
+        df = df[df["RII"]]
+
+    selected_lineage = df.query(make_query(pango_lineage=pango_lineage))
+
+    # Counting
+    sequencing_volume = (
+        group_counts(df, ["ISO", time_column])
+        .to_frame("Sequencing volume")
+        .reset_index()
+    )
+    selected_pango_lineages = (
+        group_counts(selected_lineage, ["ISO", time_column])
+        .to_frame("Count")
+        .reset_index()
+    )
+    merged = sequencing_volume.merge(
+        selected_pango_lineages, on=["ISO", time_column], how="left"
+    ).fillna({"Count": 0})
+    merged["Proportion"] = (
+        (100 * merged["Count"] / merged["Sequencing volume"]).round().astype(int)
+    )
+
+    if time_clip:
+        cutoff = merged.loc[merged["Proportion"].gt(0), time_column].min()
+        merged = merged[merged[time_column].ge(cutoff)]
+
+    return merged
+
+
+def variant_region_proportion_chart(
+    merged: pd.DataFrame, time_column: str, title: str, color_scheme: str = "reds"
+) -> alt.Chart:
+    import altair as alt
+
+    return (
+        alt.Chart(merged)
+        .mark_circle(stroke="black", strokeWidth=1)
+        .encode(
+            x=f"{time_column}:O",
+            y="ISO:N",
+            size=alt.Size("Sequencing volume:Q", scale=alt.Scale(type="log")),
+            color=alt.condition(
+                "datum.Proportion == 0",
+                alt.value("white"),
+                alt.Color("Proportion:Q", scale=alt.Scale(scheme=color_scheme)),
+            ),
+        )
+        .properties(title=title)
+    )
+
+
+def variant_region_proportion_table(
+    merged: pd.DataFrame, time_column: str
+) -> pd.DataFrame:
+    return (
+        merged.pivot(index="ISO", columns=time_column, values="Proportion")
+        .fillna(0)
+        .astype(int)
+    )
 
 
 @click.command()
@@ -44,6 +128,13 @@ from rii.gisaid import make_query
 @click.option("--table", help="Write pivot table", is_flag=True)
 @click.option("--rii-only", type=bool, default=False, show_default=True, is_flag=True)
 @click.option("--color-scheme", default="reds", show_default=True)
+@cached_command(
+    inputs=("metadata",),
+    outputs=lambda params: [
+        Path(f"{params['output']}.{params['format']}"),
+        *([Path(f"{params['output']}.xlsx")] if params["table"] else []),
+    ],
+)
 def plot_variant_region_proportion(
     metadata: Path,
     pango_lineage: tuple[str],
@@ -57,77 +148,33 @@ def plot_variant_region_proportion(
     rii_only: bool = False,
     color_scheme: str = "reds",
 ) -> None:
-    metadata_df = pd.read_csv(metadata, sep="\t")
+    import pandas as pd
 
-    # Filtering
-    step_to_column = {
-        "day": "Collection date",
-        "week": "Collection week",
-        "month": "Collection month",
-    }
-    time_column = step_to_column[time_step]
-    df = metadata_df
-    if time_from is not None:
-        df = df[df[time_column].ge(time_from)]
-    if time_to is not None:
-        df = df[df[time_column].le(time_to)]
-    if rii_only:
-        df = df[df["RII"]]
+    from rii.xlsx import write_xlsx
 
-    selected_lineage = df.query(make_query(pango_lineage=pango_lineage))
+    metadata_df = pd.read_csv(metadata, sep="\t")
 
-    # Counting
-    sequencing_volume = (
-        df.groupby(["ISO", time_column])["Accession ID"]
-        .agg("count")
-        .to_frame("Sequencing volume")
-        .reset_index()
-    )
-    selected_pango_lineages = (
-        selected_lineage.groupby(["ISO", time_column])["Accession ID"]
-        .agg("count")
-        .to_frame("Count")
-        .reset_index()
+    time_column = STEP_TO_COLUMN[time_step]
+    merged = variant_region_proportion(
+        metadata_df,
+        pango_lineage,
+        time_column,
+        time_from=time_from,
+        time_to=time_to,
+        time_clip=time_clip,
+        rii_only=rii_only,
     )
-    merged = sequencing_volume.merge(
-        selected_pango_lineages, on=["ISO", time_column], how="left"
-    ).fillna(0)
-    merged["Proportion"] = (
-        (100 * merged["Count"] / merged["Sequencing volume"]).round().astype(int)
-    )
-
-    if time_clip:
-        cutoff = merged.loc[merged["Proportion"].gt(0), time_column].min()
-        merged = merged[merged[time_column].ge(cutoff)]
 
     # Plotting
     title = ", ".join(pango_lineage)
     warnings.simplefilter("ignore")
-    chart = (
-        alt.Chart(merged)
-        .mark_circle(stroke="black", strokeWidth=1)
-        .encode(
-            x=f"{time_column}:O",
-            y="ISO:N",
-            size=alt.Size("Sequencing volume:Q", scale=alt.Scale(type="log")),
-            color=alt.condition(
-                "datum.Proportion == 0",
-                alt.value("white"),
-                alt.Color("Proportion:Q", scale=alt.Scale(scheme=color_scheme)),
-            ),
-        )
-        .properties(title=title)
-    )
+    chart = variant_region_proportion_chart(merged, time_column, title, color_scheme)
     output_filename = f"{output}.{format}"
     chart.save(output_filename)
 
     if table:
-        pivot = (
-            merged.pivot(index="ISO", columns=time_column, values="Proportion")
-            .fillna(0)
-            .astype(int)
-        )
-        pivot.to_excel(f"{output}.xlsx")
+        pivot = variant_region_proportion_table(merged, time_column)
+        write_xlsx(Path(f"{output}.xlsx"), {"Sheet1": pivot})
 
 
 if __name__ == "__main__":
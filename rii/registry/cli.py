@@ -2,9 +2,8 @@ from pathlib import Path
 from typing import Literal
 
 import click
-import yaml
 
-import rii.registry.etl
+import rii.registry.join
 
 
 @click.command()
@@ -13,6 +12,10 @@ import rii.registry.etl
 def extract(table: Literal["gz", "pcr_21-22", "pcr_22-23"], file: Path) -> None:
     """Extract data from registry excel file to tsv."""
 
+    import yaml
+
+    import rii.registry.etl
+
     with open("rii/registry/extract.yml", "r") as fi:
         extract_schemes = yaml.load(fi, Loader=yaml.Loader)
 
@@ -21,5 +24,54 @@ def extract(table: Literal["gz", "pcr_21-22", "pcr_22-23"], file: Path) -> None:
     data.to_csv(f"{table}.tsv", sep="\t", index=False)
 
 
+@click.command()
+@click.argument(
+    "registry", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.argument(
+    "metadata", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option("--registry-key", required=True, help="Registry lab ID column")
+@click.option(
+    "--gisaid-key",
+    default="Virus name",
+    show_default=True,
+    help="GISAID column containing lab ID",
+)
+@click.option(
+    "--pattern",
+    default=rii.registry.join.RII_LAB_ID_PATTERN,
+    show_default=True,
+    help="Regex with one group extracting lab ID from GISAID column",
+)
+@click.option("--output", "-o", default="joined", show_default=True)
+def join(
+    registry: Path,
+    metadata: Path,
+    registry_key: str,
+    gisaid_key: str,
+    pattern: str,
+    output: str,
+) -> None:
+    """Join registry tsv with GISAID metadata (extract or dump) by normalized lab ID."""
+
+    import pandas as pd
+
+    from rii.gisaid import iter_metadata
+
+    registry_df = pd.read_csv(registry, sep="\t", dtype=str)
+
+    stats = rii.registry.join.join_chunks(
+        iter_metadata(metadata),
+        registry_df,
+        registry_key=registry_key,
+        gisaid_key=gisaid_key,
+        pattern=pattern,
+        output=output,
+    )
+    for name, count in stats.items():
+        click.echo(f"{name}: {count}")
+
+
 if __name__ == "__main__":
     extract()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional
+
+# pandas is only needed for annotations, join CLI imports this module eagerly
+if TYPE_CHECKING:
+    import pandas as pd
+
+RII_LAB_ID_PATTERN = r"-RII-([^/]+)/"
+
+
+def normalize_key(values: pd.Series) -> pd.Series:
+    """Uppercase and drop everything but letters and digits, empty keys become NA."""
+
+    normalized = (
+        values.astype("string")
+        .str.upper()
+        .str.replace(r"[^0-9A-ZА-ЯЁ]", "", regex=True)
+    )
+    return normalized.mask(normalized.eq(""))
+
+
+def registry_index(
+    registry: pd.DataFrame, key_column: str
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Split registry into rows with unique normalized key and rows sharing a key."""
+
+    registry = registry.assign(_key=normalize_key(registry[key_column])).dropna(
+        subset=["_key"]
+    )
+    duplicated = registry["_key"].duplicated(keep=False)
+    unique = registry[~duplicated].set_index("_key")
+    ambiguous = registry[duplicated]
+    return unique, ambiguous
+
+
+def join_chunks(
+    chunks: Iterable[pd.DataFrame],
+    registry: pd.DataFrame,
+    registry_key: str,
+    gisaid_key: str,
+    pattern: str,
+    output: str,
+    chunksize: int = 100_000,
+) -> dict[str, int]:
+    """Stream GISAID chunks against hash index of registry and write matched, unmatched and ambiguous sets.
+
+    Only GISAID records with a key extracted by pattern take part. Keys shared
+    by several registry rows or by several GISAID records are ambiguous. The
+    latter is known only after the last chunk, so matches are spooled to
+    <output>.matched.tsv.part and split at the end.
+    """
+
+    import pandas as pd
+
+    registry_unique, ambiguous_registry = registry_index(registry, registry_key)
+    unique = registry_unique.add_prefix("registry ")
+    ambiguous_keys = set(ambiguous_registry["_key"])
+
+    paths = {
+        name: Path(f"{output}.{name}.tsv")
+        for name in ("matched", "unmatched_gisaid", "ambiguous", "unmatched_registry")
+    }
+    spool = Path(f"{output}.matched.tsv.part")
+    for path in [*paths.values(), spool]:
+        path.unlink(missing_ok=True)
+
+    def write(name: str, df: pd.DataFrame, path: Optional[Path] = None) -> None:
+        path = path or paths[name]
+        df.to_csv(path, sep="\t", index=False, mode="a", header=not path.exists())
+
+    matches: Counter = Counter()
+    stats: Counter = Counter()
+    for chunk in chunks:
+        keys = normalize_key(chunk[gisaid_key].str.extract(pattern, expand=False))
+        chunk = chunk.assign(Key=keys)[keys.notna()]
+        stats["gisaid"] += len(chunk)
+
+        is_ambiguous = chunk["Key"].isin(ambiguous_keys)
+        is_matched = chunk["Key"].isin(unique.index)
+
+        matched = chunk[is_matched].join(unique, on="Key")
+        matches.update(matched["Key"])
+        ambiguous = chunk[is_ambiguous].merge(
+            ambiguous_registry.add_prefix("registry "),
+            left_on="Key",
+            right_on="registry _key",
+        )
+        matches.update(ambiguous["Key"].unique())
+
+        if len(matched):
+            write("matched", matched, spool)
+        for name, df in (
+            ("unmatched_gisaid", chunk[~is_matched & ~is_ambiguous]),
+            ("ambiguous", ambiguous.drop(columns="registry _key")),
+        ):
+            if len(df):
+                write(name, df)
+                stats[name] += len(df)
+
+    # Registry keys found in several GISAID records are ambiguous too
+    multiple = {key for key in unique.index if matches[key] > 1}
+    if spool.exists():
+        for matched in pd.read_csv(
+            spool, sep="\t", dtype=str, keep_default_na=False, chunksize=chunksize
+        ):
+            is_multiple = matched["Key"].isin(multiple)
+            for name, df in (
+                ("matched", matched[~is_multiple]),
+                ("ambiguous", matched[is_multiple]),
+            ):
+                if len(df):
+                    write(name, df)
+                    stats[name] += len(df)
+        spool.unlink()
+
+    unmatched_registry = pd.concat(
+        [
+            registry_unique[~registry_unique.index.isin(list(matches))].reset_index(
+                drop=True
+            ),
+            ambiguous_registry[~ambiguous_registry["_key"].isin(list(matches))].drop(
+                columns="_key"
+            ),
+        ],
+        ignore_index=True,
+    )
+    write("unmatched_registry", unmatched_registry)
+    stats["unmatched_registry"] = len(unmatched_registry)
+    stats["registry_multiple_gisaid"] = len(multiple)
+
+    return dict(stats)
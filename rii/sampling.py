@@ -0,0 +1,68 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from rii.helpers import SAMPLING_WEIGHT
+
+PRIORITY = "_priority"
+ROW = "_row"
+STRATUM = "_stratum"
+
+
+class StratifiedReservoir:
+    """Single-pass reservoir sample of up to size records per stratum.
+
+    Every record gets a uniform random priority and each stratum keeps the
+    size records with the lowest ones, which is a uniform sample without
+    replacement however the records are split into chunks. Memory is bounded
+    by strata x size plus one chunk.
+    """
+
+    def __init__(
+        self, size: int, stratify: list[str], seed: Optional[int] = None
+    ) -> None:
+        self.size = size
+        self.stratify = stratify
+        self.rng = np.random.default_rng(seed)
+        self.reservoir: Optional[pd.DataFrame] = None
+        self.counts = pd.Series(dtype=float)
+        self.seen = 0
+
+    def stratum(self, df: pd.DataFrame) -> pd.Series:
+        # Single string key, so missing values form their own stratum
+        key = df[self.stratify[0]].astype(str)
+        for column in self.stratify[1:]:
+            key = key + "\x1f" + df[column].astype(str)
+        return key
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        chunk = chunk.assign(
+            **{
+                PRIORITY: self.rng.random(len(chunk)),
+                ROW: np.arange(self.seen, self.seen + len(chunk)),
+                STRATUM: self.stratum(chunk),
+            }
+        )
+        self.seen += len(chunk)
+        self.counts = self.counts.add(chunk[STRATUM].value_counts(), fill_value=0)
+
+        if self.reservoir is not None:
+            chunk = pd.concat([self.reservoir, chunk], ignore_index=True)
+        self.reservoir = (
+            chunk.sort_values(PRIORITY).groupby(STRATUM, sort=False).head(self.size)
+        )
+
+    def sample(self) -> pd.DataFrame:
+        """Sampled records in input order with weight = stratum size / stratum sample size."""
+
+        if self.reservoir is None:
+            return pd.DataFrame()
+
+        sampled = self.reservoir[STRATUM].value_counts()
+        weights = self.reservoir[STRATUM].map(self.counts / sampled)
+        return (
+            self.reservoir.assign(**{SAMPLING_WEIGHT: weights})
+            .sort_values(ROW)
+            .drop(columns=[PRIORITY, ROW, STRATUM])
+        )
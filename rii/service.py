@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import socketserver
+import warnings
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import click
+
+from rii.helpers import (
+    SAMPLING_WEIGHT,
+    STEP_TO_COLUMN,
+    count_frequency,
+    group_counts,
+)
+from rii.logging_config import setup_logging
+from rii.plots.plot_pango_bar import (
+    pango_bar_chart,
+    pango_bar_tables,
+    prepare_pango_bar,
+)
+from rii.plots.plot_spike_substitutions import (
+    spike_substitutions,
+    spike_substitutions_chart,
+)
+from rii.plots.plot_variant_region_proportion import (
+    variant_region_proportion,
+    variant_region_proportion_chart,
+    variant_region_proportion_table,
+)
+
+logger = logging.getLogger(__name__)
+
+Params = dict[str, list[str]]
+
+if TYPE_CHECKING:
+    import altair as alt
+    import pandas as pd
+
+    Result = tuple[pd.DataFrame, Optional[alt.Chart]]
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "tsv": "text/tab-separated-values; charset=utf-8",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+
+
+def get_param(
+    params: Params,
+    name: str,
+    default=None,
+    type: Callable = str,
+    required: bool = False,
+    choices: Optional[Iterable[str]] = None,
+):
+    """Last value of query parameter, ValueError (answered with 400) if invalid."""
+
+    if name not in params:
+        if required:
+            raise ValueError(f"Missing required parameter: {name}")
+        return default
+    value = params[name][-1]
+    if choices is not None and value not in choices:
+        raise ValueError(f"{name} must be one of: {', '.join(choices)}")
+    if type is bool:
+        return value.lower() in ("1", "true", "yes", "on")
+    try:
+        return type(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}") from None
+
+
+def get_list(params: Params, name: str, required: bool = False) -> tuple[str, ...]:
+    values = tuple(params.get(name, []))
+    if required and not values:
+        raise ValueError(f"Missing required parameter: {name}")
+    return values
+
+
+def get_time_column(params: Params) -> str:
+    return STEP_TO_COLUMN[
+        get_param(params, "time_step", "week", choices=STEP_TO_COLUMN)
+    ]
+
+
+def pango_bar_op(df: pd.DataFrame, params: Params) -> Result:
+    time_column = get_time_column(params)
+    prepared = prepare_pango_bar(
+        df,
+        get_param(params, "frequency_cutoff", 0.01, float),
+        time_column,
+        get_param(params, "time_from"),
+        get_param(params, "time_to"),
+    )
+    data = (
+        group_counts(prepared, [time_column, "Pango lineage prepared"])
+        .to_frame("Count")
+        .reset_index()
+    )
+    return data, pango_bar_chart(prepared, time_column)
+
+
+def pango_bar_table_op(df: pd.DataFrame, params: Params) -> Result:
+    time_column = get_time_column(params)
+    prepared = prepare_pango_bar(
+        df,
+        get_param(params, "frequency_cutoff", 0.01, float),
+        time_column,
+        get_param(params, "time_from"),
+        get_param(params, "time_to"),
+    )
+    pivot, _ = pango_bar_tables(prepared, time_column)
+    return pivot.reset_index(), None
+
+
+def _variant_region_proportion(df: pd.DataFrame, params: Params) -> pd.DataFrame:
+    return variant_region_proportion(
+        df,
+        get_list(params, "pango_lineage", required=True),
+        get_time_column(params),
+        time_from=get_param(params, "time_from"),
+        time_to=get_param(params, "time_to"),
+        time_clip=get_param(params, "time_clip", False, bool),
+        rii_only=get_param(params, "rii_only", False, bool),
+    )
+
+
+def variant_region_proportion_op(df: pd.DataFrame, params: Params) -> Result:
+    merged = _variant_region_proportion(df, params)
+    chart = variant_region_proportion_chart(
+        merged,
+        get_time_column(params),
+        ", ".join(params.get("pango_lineage", [])),
+        get_param(params, "color_scheme", "reds"),
+    )
+    return merged, chart
+
+
+def variant_region_proportion_table_op(df: pd.DataFrame, params: Params) -> Result:
+    merged = _variant_region_proportion(df, params)
+    time_column = get_time_column(params)
+    return variant_region_proportion_table(merged, time_column).reset_index(), None
+
+
+def spike_substitutions_op(df: pd.DataFrame, params: Params) -> Result:
+    columns = ["Accession ID", "AA Substitutions", "Pango lineage", SAMPLING_WEIGHT]
+    metadata_df = df[df.columns.intersection(columns)].set_index("Accession ID")
+    data = spike_substitutions(
+        metadata_df, get_list(params, "pango_lineage", required=True)
+    )
+    return data, spike_substitutions_chart(data)
+
+
+def count_frequency_op(df: pd.DataFrame, params: Params) -> Result:
+    data = count_frequency(
+        df,
+        column=get_param(params, "column", required=True),
+        groupby=params.get("groupby"),
+    )
+    return data, None
+
+
+OPERATIONS: dict[str, Callable[[pd.DataFrame, Params], Result]] = {
+    "pango_bar": pango_bar_op,
+    "pango_bar/table": pango_bar_table_op,
+    "variant_region_proportion": variant_region_proportion_op,
+    "variant_region_proportion/table": variant_region_proportion_table_op,
+    "spike_substitutions": spike_substitutions_op,
+    "count_frequency": count_frequency_op,
+}
+
+
+class MetadataService:
+    """Metadata table kept in memory with LRU cache of computed results."""
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = 128) -> None:
+        self.df = df
+        self.run = lru_cache(maxsize=cache_size)(self._run)
+        self.render = lru_cache(maxsize=cache_size)(self._render)
+
+    @classmethod
+    def from_file(cls, file: Path, cache_size: int = 128) -> "MetadataService":
+        import pandas as pd
+
+        from rii.gisaid import METADATA_DTYPES
+
+        if file.suffix == ".parquet":
+            df = pd.read_parquet(file)
+        else:
+            # Low cardinality columns are categorical, time columns stay strings
+            # for range filters, columns added by --enrich get their types.
+            dtypes = METADATA_DTYPES.copy()
+            dtypes.update(
+                {
+                    "ISO": "category",
+                    "Location": "category",
+                    "Pango lineage": "category",
+                    "Pango lineage cut": "category",
+                    "Variant cut": "category",
+                    "RII": pd.BooleanDtype(),
+                    SAMPLING_WEIGHT: "float64",
+                }
+            )
+            df = pd.read_csv(file, sep="\t", dtype=dtypes)
+        return cls(df, cache_size=cache_size)
+
+    @staticmethod
+    def normalize(params: Params) -> tuple[tuple[str, tuple[str, ...]], ...]:
+        return tuple(
+            sorted((key, tuple(values)) for key, values in params.items() if values)
+        )
+
+    def _run(
+        self, operation: str, params: tuple[tuple[str, tuple[str, ...]], ...]
+    ) -> Result:
+        return OPERATIONS[operation](
+            self.df, {key: list(values) for key, values in params}
+        )
+
+    def _render(
+        self,
+        operation: str,
+        params: tuple[tuple[str, tuple[str, ...]], ...],
+        format: str,
+    ) -> bytes:
+        data, chart = self.run(operation, params)
+        if format == "json":
+            return data.to_json(orient="records", force_ascii=False).encode()
+        if format == "tsv":
+            return data.to_csv(sep="\t", index=False).encode()
+        if chart is None:
+            raise ValueError(f"{operation} has no chart")
+        if format == "svg":
+            svg = io.StringIO()
+            chart.save(svg, format="svg")
+            return svg.getvalue().encode()
+        png = io.BytesIO()
+        chart.save(png, format="png")
+        return png.getvalue()
+
+    def query(self, operation: str, params: Params) -> tuple[bytes, str]:
+        """Answer operation with data (json, tsv) or chart (svg, png)."""
+
+        if operation not in OPERATIONS:
+            raise KeyError(operation)
+        params = dict(params)
+        format = get_param(params, "format", "json", choices=CONTENT_TYPES)
+        params.pop("format", None)
+        content = self.render(operation, self.normalize(params), format)
+        return content, CONTENT_TYPES[format]
+
+    def info(self) -> dict:
+        return {
+            "rows": len(self.df),
+            "operations": list(OPERATIONS),
+            "cache": self.render.cache_info()._asdict(),
+        }
+
+
+def make_handler(service: MetadataService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def address_string(self) -> str:
+            # Unix socket clients have no host address
+            return self.client_address[0] if self.client_address else "unix"
+
+        def send(self, status: int, content: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def send_error_json(self, status: int, message: str) -> None:
+            content = json.dumps({"error": message}, ensure_ascii=False).encode()
+            self.send(status, content, CONTENT_TYPES["json"])
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            operation = url.path.strip("/")
+            if not operation:
+                self.send(
+                    200, json.dumps(service.info()).encode(), CONTENT_TYPES["json"]
+                )
+                return
+            if operation not in OPERATIONS:
+                self.send_error_json(404, f"Unknown operation: {operation}")
+                return
+            try:
+                content, content_type = service.query(operation, parse_qs(url.query))
+            except KeyError as e:
+                self.send_error_json(400, f"Unknown column: {e}")
+            except ValueError as e:
+                self.send_error_json(400, str(e))
+            except Exception as e:
+                logger.exception("Failed %s", self.path)
+                self.send_error_json(500, repr(e))
+            else:
+                self.send(200, content, content_type)
+
+    return Handler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+@click.command()
+@click.argument(
+    "metadata",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=True,
+)
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8765, show_default=True)
+@click.option(
+    "--socket",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Listen on unix socket instead of host:port",
+)
+@click.option("--cache-size", type=int, default=128, show_default=True)
+def serve_metadata(
+    metadata: Path,
+    host: str,
+    port: int,
+    socket: Optional[Path],
+    cache_size: int,
+) -> None:
+    """Load metadata (.tsv with added columns or .parquet) once and serve plots and tables over HTTP."""
+
+    import altair as alt
+
+    setup_logging()
+    alt.data_transformers.disable_max_rows()
+    warnings.simplefilter("ignore")
+
+    service = MetadataService.from_file(metadata, cache_size=cache_size)
+    logger.info("Loaded %d records from %s", len(service.df), metadata)
+
+    handler = make_handler(service)
+    if socket is not None:
+        socket.unlink(missing_ok=True)
+        server: socketserver.BaseServer = UnixHTTPServer(str(socket), handler)
+        logger.info("Listening on %s", socket)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        logger.info("Listening on http://%s:%d", host, port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket is not None:
+            socket.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    serve_metadata()
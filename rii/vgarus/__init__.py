@@ -0,0 +1 @@
+DEFAULT_BASE_URL = "https://genome.crie.ru"
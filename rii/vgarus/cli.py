@@ -0,0 +1,131 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from rii.logging_config import setup_logging
+from rii.vgarus import DEFAULT_BASE_URL
+
+
+def read_env_file(file: Path) -> dict[str, str]:
+    env = {}
+    with open(file, "r") as fi:
+        for line in fi:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            env[key.strip()] = value.strip().strip("'\"")
+    return env
+
+
+@click.group()
+def vgarus() -> None:
+    """Upload sequences and metadata to VGARUS."""
+
+    setup_logging()
+
+
+@vgarus.command()
+@click.argument(
+    "metadata", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.argument("fasta", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option(
+    "--key",
+    default="Virus name",
+    show_default=True,
+    help="Metadata column matching FASTA record names",
+)
+@click.option("--output", "-o", default="package.json", show_default=True)
+def combine_package(metadata: Path, fasta: Path, key: str, output: str) -> None:
+    """Combine metadata .tsv and .fasta into json package."""
+
+    import pandas as pd
+    from Bio import SeqIO
+
+    from rii.vgarus.models import Sample
+
+    metadata_df = pd.read_csv(metadata, sep="\t", dtype=str).fillna("")
+    metadata_records = {row[key]: row for row in metadata_df.to_dict("records")}
+
+    samples = []
+    combined: set[str] = set()
+    for record in SeqIO.parse(fasta, "fasta"):
+        name = record.id.split("|", 1)[0]
+        if name not in metadata_records or name in combined:
+            continue
+        combined.add(name)
+        samples.append(
+            dict(
+                Sample(
+                    name=name,
+                    metadata=metadata_records[name],
+                    sequence=str(record.seq),
+                )
+            )
+        )
+
+    with open(output, "w") as fo:
+        json.dump(samples, fo, ensure_ascii=False)
+    click.echo(f"Combined {len(samples)} of {len(metadata_records)} samples")
+
+
+@vgarus.command()
+@click.argument("package", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--username", envvar="VGARUS_USERNAME")
+@click.option("--password", envvar="VGARUS_PASSWORD")
+@click.option(
+    "--env-file", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option("--url", default=DEFAULT_BASE_URL, show_default=True)
+@click.option("--workers", "-w", type=int, default=4, show_default=True)
+@click.option("--batch-size", "-b", type=int, default=100, show_default=True)
+@click.option("--retries", type=int, default=5, show_default=True)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Submitted samples list, default <package>.done",
+)
+def upload(
+    package: Path,
+    username: Optional[str],
+    password: Optional[str],
+    env_file: Optional[Path],
+    url: str,
+    workers: int,
+    batch_size: int,
+    retries: int,
+    checkpoint: Optional[Path],
+) -> None:
+    """Upload json package, resuming from checkpoint if interrupted."""
+
+    from rii.vgarus.client import Checkpoint, VgarusClient
+    from rii.vgarus.models import Sample
+
+    if env_file:
+        env = read_env_file(env_file)
+        username = username or env.get("VGARUS_USERNAME")
+        password = password or env.get("VGARUS_PASSWORD")
+    if not username or not password:
+        raise click.UsageError("VGARUS credentials are not set")
+
+    with open(package, "r") as fi:
+        samples = [Sample(**item) for item in json.load(fi)]
+
+    checkpoint = checkpoint or package.with_name(package.name + ".done")
+    with VgarusClient(
+        username, password, base_url=url, workers=workers, retries=retries
+    ) as client:
+        submitted, failed = client.upload(
+            samples, batch_size=batch_size, checkpoint=Checkpoint(checkpoint)
+        )
+
+    click.echo(f"Submitted: {submitted}, failed: {failed}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    vgarus()
@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rii.vgarus import DEFAULT_BASE_URL
+from rii.vgarus.models import Sample
+
+logger = logging.getLogger(__name__)
+
+SUBMIT_ENDPOINT = "/api/v1/samples"
+# Batch POST is not idempotent, so it is only retried when the server surely
+# has not stored it: connection errors and explicit "come back later".
+RETRY_STATUSES = (429, 503)
+
+
+class Checkpoint:
+    """Append-only file of submitted sample names to resume interrupted uploads."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: set[str] = set()
+        if path.exists():
+            with open(path, "r") as fi:
+                self.done.update(line.rstrip("\n") for line in fi if line.strip())
+
+    def add(self, names: Iterable[str]) -> None:
+        names = list(names)
+        with self._lock:
+            with open(self.path, "a") as fo:
+                fo.writelines(f"{name}\n" for name in names)
+            self.done.update(names)
+
+
+class VgarusClient:
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        base_url: str = DEFAULT_BASE_URL,
+        workers: int = 4,
+        retries: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 60.0,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.timeout = timeout
+
+        # One pooled session shared by all workers, keep-alive connections
+        # are reused instead of opening a new one per submission.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            other=0,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=workers, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "VgarusClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def idempotency_key(samples: list[Sample]) -> str:
+        names = "\n".join(sample.name for sample in samples)
+        return hashlib.sha256(names.encode()).hexdigest()
+
+    def submit(self, samples: list[Sample]) -> None:
+        response = self.session.post(
+            self.base_url + SUBMIT_ENDPOINT,
+            json=[dict(sample) for sample in samples],
+            headers={"Idempotency-Key": self.idempotency_key(samples)},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    def upload(
+        self,
+        samples: Iterable[Sample],
+        batch_size: int = 100,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> tuple[int, int]:
+        """Submit samples in batches concurrently, skipping ones already in checkpoint.
+
+        Returns counts of submitted and failed samples.
+        """
+
+        pending = [
+            sample
+            for sample in samples
+            if checkpoint is None or sample.name not in checkpoint.done
+        ]
+        batches = [
+            pending[i : i + batch_size] for i in range(0, len(pending), batch_size)
+        ]
+        logger.info("Uploading %d samples in %d batches", len(pending), len(batches))
+
+        submitted, failed = 0, 0
+        running: dict[Future, list[Sample]] = {}
+
+        def finish(futures: Iterable[Future]) -> None:
+            nonlocal submitted, failed
+            for future in futures:
+                batch = running[future]
+                names = [sample.name for sample in batch]
+                try:
+                    future.result()
+                except requests.RequestException as e:
+                    failed += len(batch)
+                    logger.error("Failed %s: %s", ", ".join(names), e)
+                else:
+                    submitted += len(batch)
+                    if checkpoint is not None:
+                        checkpoint.add(names)
+                    logger.info("Submitted %s", ", ".join(names))
+                del running[future]
+
+        # At most workers batches are in flight, so on interrupt nothing is
+        # left queued and every batch that reached the server is checkpointed.
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for batch in batches:
+                if len(running) >= self.workers:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    finish(done)
+                running[executor.submit(self.submit, batch)] = batch
+            finish(wait(running).done)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            finish([future for future in running if not future.cancelled()])
+
+        return submitted, failed
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class Sample(BaseModel):
+    name: str
+    metadata: dict[str, str]
+    sequence: str
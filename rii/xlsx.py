@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+EXCEL_MAX_ROWS = 1_048_576
+
+
+class XlsxStreamWriter:
+    """Write data frames to .xlsx row by row in openpyxl write-only mode.
+
+    Rows are streamed to disk as they are appended, so memory does not grow
+    with the table size. Frames appended to the same sheet name continue it and
+    spill over to '<name> 2', '<name> 3', ... past Excel row limit.
+    """
+
+    def __init__(self, path: Path, max_rows: int = EXCEL_MAX_ROWS) -> None:
+        self.path = path
+        self.max_rows = max_rows
+        self.workbook = Workbook(write_only=True)
+        self._sheets: dict[str, tuple] = {}
+
+    def __enter__(self) -> "XlsxStreamWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._sheets:
+            self.workbook.create_sheet()
+        self.workbook.save(self.path)
+
+    def _new_sheet(self, name: str, part: int, header: list):
+        title = name if part == 1 else f"{name} {part}"
+        sheet = self.workbook.create_sheet(title=title[:31])
+        sheet.append(header)
+        self._sheets[name] = (sheet, part, 1, header)
+        return self._sheets[name]
+
+    def write(self, df: pd.DataFrame, sheet_name: str, index: bool = False) -> None:
+        if index:
+            df = df.reset_index()
+        header = [str(column) for column in df.columns]
+
+        if sheet_name in self._sheets:
+            sheet, part, rows, _ = self._sheets[sheet_name]
+        else:
+            sheet, part, rows, _ = self._new_sheet(sheet_name, 1, header)
+
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if rows >= self.max_rows:
+                sheet, part, rows, _ = self._new_sheet(sheet_name, part + 1, header)
+            sheet.append(row)
+            rows += 1
+        self._sheets[sheet_name] = (sheet, part, rows, header)
+
+
+def write_xlsx(path: Path, sheets: dict[str, pd.DataFrame], index: bool = True) -> None:
+    with XlsxStreamWriter(path) as writer:
+        for sheet_name, df in sheets.items():
+            writer.write(df, sheet_name, index=index)
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import click
+from click.testing import CliRunner
+
+from rii.cache import ResultCache, cached_command
+
+
+def test_key_changes_on_same_size_edit(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=10**9)
+    metadata = tmp_path / "metadata.tsv"
+    lines = [f"EPI_ISL_{i}\tBA.5.2\n" for i in range(100_000)]
+    metadata.write_text("".join(lines))
+    before = cache.key("command", [metadata], {})
+
+    lines[50_000] = lines[50_000].replace("BA.5.2", "BA.2.9")
+    metadata.write_text("".join(lines))
+
+    assert cache.key("command", [metadata], {}) != before
+
+
+def test_fingerprint_is_remembered(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache", max_size=10**9)
+    metadata = tmp_path / "metadata.tsv"
+    metadata.write_text("EPI_ISL_1\tBA.5.2\n")
+    expected = cache.fingerprint(metadata)
+
+    monkeypatch.setattr("rii.cache.file_hash", lambda file: "recomputed")
+    assert cache.fingerprint(metadata) == expected
+
+
+def test_output_edited_in_place_keeps_cache_entry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metadata = tmp_path / "metadata.tsv"
+    metadata.write_text("EPI_ISL_1\tBA.5.2\n")
+    runs = []
+
+    @click.command()
+    @click.argument("metadata", type=click.Path(path_type=Path))
+    @click.option("--output", default="out.tsv")
+    @cached_command(
+        inputs=("metadata",), outputs=lambda params: [Path(params["output"])]
+    )
+    def command(metadata: Path, output: str) -> None:
+        runs.append(output)
+        Path(output).write_text(metadata.read_text())
+
+    args = [str(metadata), "--cache-dir", str(tmp_path / "cache")]
+    runner = CliRunner()
+    assert runner.invoke(command, args).exit_code == 0
+    assert runner.invoke(command, args).exit_code == 0
+    with open("out.tsv", "a") as fo:
+        fo.write("appended\n")
+    assert runner.invoke(command, args).exit_code == 0
+
+    assert len(runs) == 1
+    assert Path("out.tsv").read_text() == "EPI_ISL_1\tBA.5.2\n"
+
+
+def test_run_without_table_keeps_previous_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metadata = tmp_path / "metadata.tsv"
+    metadata.write_text("EPI_ISL_1\tBA.5.2\n")
+
+    @click.command()
+    @click.argument("metadata", type=click.Path(path_type=Path))
+    @click.option("--table", is_flag=True)
+    @cached_command(
+        inputs=("metadata",),
+        outputs=lambda params: [
+            Path("plot.svg"),
+            *([Path("plot.xlsx")] if params["table"] else []),
+        ],
+    )
+    def command(metadata: Path, table: bool) -> None:
+        Path("plot.svg").write_text("svg")
+        if table:
+            Path("plot.xlsx").write_text("xlsx")
+
+    args = [str(metadata), "--cache-dir", str(tmp_path / "cache")]
+    runner = CliRunner()
+    assert runner.invoke(command, args + ["--table"]).exit_code == 0
+    for extra in (["--no-cache"], []):
+        assert runner.invoke(command, args + extra).exit_code == 0
+        assert Path("plot.xlsx").read_text() == "xlsx"
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from rii.cli import COMMANDS
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = (
+    "pandas",
+    "numpy",
+    "altair",
+    "tqdm",
+    "openpyxl",
+    "requests",
+    "Bio",
+    "pydantic",
+    "yaml",
+    "pdpipe",
+)
+
+PROBE = """
+import sys
+from click.testing import CliRunner
+from rii.cli import rii
+
+result = CliRunner().invoke(rii, sys.argv[1:])
+assert result.exit_code == 0, result.output
+print(" ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def imported_heavy_modules(*args: str) -> list[str]:
+    """Heavy modules imported by `rii <args>` in a fresh interpreter."""
+
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES), *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.split()
+
+
+def test_rii_help_is_light():
+    assert imported_heavy_modules("--help") == []
+
+
+@pytest.mark.parametrize("command", sorted(COMMANDS))
+def test_command_help_is_light(command):
+    assert imported_heavy_modules(command, "--help") == []
+
+
+@pytest.mark.parametrize("command", ["combine-package", "upload"])
+def test_vgarus_command_help_is_light(command):
+    assert imported_heavy_modules("vgarus", command, "--help") == []
@@ -0,0 +1,52 @@
+import tarfile
+
+from rii.fasta import (
+    decompress_fasta,
+    fetch_records,
+    index_path,
+    load_or_build_index,
+)
+
+
+def test_fetches_requested_records(tmp_path):
+    fasta = tmp_path / "sequences.fasta"
+    fasta.write_bytes(
+        b">hCoV-19/A|EPI_ISL_1\nACGT\nACGT\n"
+        b">hCoV-19/B|EPI_ISL_2\nGGGG\n"
+        b">hCoV-19/A|EPI_ISL_3\nTTTT\n"
+        b">hCoV-19/C|EPI_ISL_4\nCCCC"
+    )
+    names = ["hCoV-19/C", "hCoV-19/A", "hCoV-19/missing"]
+
+    index = load_or_build_index(fasta, names)
+
+    assert index_path(fasta).exists()
+    assert set(index) == {"hCoV-19/A", "hCoV-19/C"}
+    assert list(fetch_records(fasta, index, names)) == [
+        b">hCoV-19/A|EPI_ISL_1\nACGT\nACGT\n",
+        b">hCoV-19/C|EPI_ISL_4\nCCCC\n",
+    ]
+    # Second run reads the index instead of scanning
+    assert load_or_build_index(fasta, ["hCoV-19/B"]) == {"hCoV-19/B": (31, 26)}
+
+
+def make_archive(path, sequence: bytes) -> None:
+    fasta = path.with_name("sequences.fasta")
+    fasta.write_bytes(b">hCoV-19/A|EPI_ISL_1\n" + sequence + b"\n")
+    with tarfile.open(path, "w:xz") as tar:
+        tar.add(fasta, arcname="sequences.fasta")
+    fasta.unlink()
+
+
+def test_archives_in_one_directory_are_not_mixed(tmp_path):
+    make_archive(tmp_path / "old.tar.xz", b"ACGT")
+    make_archive(tmp_path / "new.tar.xz", b"GGGG")
+
+    for name, sequence in (("new", b"GGGG"), ("old", b"ACGT")):
+        fasta = decompress_fasta(tmp_path / f"{name}.tar.xz")
+        index = load_or_build_index(fasta, ["hCoV-19/A"])
+
+        assert fasta == tmp_path / f"{name}.fasta"
+        assert list(fetch_records(fasta, index, ["hCoV-19/A"])) == [
+            b">hCoV-19/A|EPI_ISL_1\n" + sequence + b"\n"
+        ]
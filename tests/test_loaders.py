@@ -0,0 +1,57 @@
+import mmap
+
+import pandas as pd
+import pytest
+
+from rii.loaders import iter_chunks_from_csv_sharded, split_line_aligned
+
+HEADER = "Virus name\tLocation\tComment\n"
+
+
+def make_tsv(path, stray_quote: bool) -> None:
+    rows = []
+    for i in range(200):
+        comment = f"plain {i}"
+        if i % 7 == 0:
+            comment = f'"first line {i}\nsecond ""quoted"" line\tstill field"'
+        elif stray_quote and i % 5 == 0:
+            # Quote inside a field is literal for pandas, it must not flip
+            # quoting state for the records after it
+            comment = f'5" tall {i}'
+        rows.append(f"hCoV-19/Russia/MOW-RII-{i}/2022\tEurope / Russia\t{comment}\n")
+    path.write_text(HEADER + "".join(rows))
+
+
+@pytest.mark.parametrize("stray_quote", [False, True])
+def test_sharded_parse_equals_serial(tmp_path, stray_quote):
+    path = tmp_path / "metadata.tsv"
+    make_tsv(path, stray_quote)
+    serial = pd.read_csv(path, sep="\t", dtype=str)
+
+    sharded = pd.concat(
+        iter_chunks_from_csv_sharded(
+            path, processes=2, shard_size=256, sep="\t", dtype=str
+        ),
+        ignore_index=True,
+    )
+
+    assert len(serial) == 200
+    pd.testing.assert_frame_equal(sharded, serial)
+
+
+def test_ranges_end_on_record_boundaries(tmp_path):
+    path = tmp_path / "metadata.tsv"
+    make_tsv(path, stray_quote=True)
+
+    with open(path, "rb") as fi:
+        with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = mm.find(b"\n") + 1
+            ranges = split_line_aligned(mm, start, 100, delimiter=b"\t")
+            size = len(mm)
+            starts = [mm[s : s + 8] for s, _ in ranges]
+
+    assert ranges[0][0] == start and ranges[-1][1] == size
+    assert all(
+        end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:])
+    )
+    assert all(s == b"hCoV-19/" for s in starts)
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from rii.registry.join import RII_LAB_ID_PATTERN, join_chunks
+
+
+def read(output, name: str) -> pd.DataFrame:
+    return pd.read_csv(f"{output}.{name}.tsv", sep="\t", dtype=str)
+
+
+def test_join_routes_duplicates_to_ambiguous(tmp_path):
+    registry = pd.DataFrame(
+        {"Lab ID": ["1", "2", "3", "3", "4", "4"], "Region": list("abcdef")}
+    )
+    chunks = [
+        pd.DataFrame(
+            {
+                "Virus name": [f"hCoV-19/Russia/MOW-RII-{i}/2022" for i in (1, 2, 3)],
+                "Accession ID": ["E1", "E2", "E3"],
+            }
+        ),
+        # Second record of lab ID 1 comes in a later chunk
+        pd.DataFrame(
+            {
+                "Virus name": [f"hCoV-19/Russia/MOW-RII-{i}/2022" for i in (1, 5)],
+                "Accession ID": ["E4", "E5"],
+            }
+        ),
+    ]
+    output = tmp_path / "joined"
+
+    stats = join_chunks(
+        chunks,
+        registry,
+        registry_key="Lab ID",
+        gisaid_key="Virus name",
+        pattern=RII_LAB_ID_PATTERN,
+        output=str(output),
+    )
+
+    assert read(output, "matched")["Accession ID"].to_list() == ["E2"]
+    assert sorted(read(output, "ambiguous")["Accession ID"]) == ["E1", "E3", "E3", "E4"]
+    assert read(output, "unmatched_gisaid")["Accession ID"].to_list() == ["E5"]
+    assert read(output, "unmatched_registry")["Region"].to_list() == ["e", "f"]
+    assert stats["registry_multiple_gisaid"] == 1
+    assert not (tmp_path / "joined.matched.tsv.part").exists()
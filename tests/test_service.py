@@ -0,0 +1,100 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pandas as pd
+import pytest
+
+from rii.service import MetadataService, make_handler
+
+METADATA = pd.DataFrame(
+    {
+        "Accession ID": ["EPI_ISL_1", "EPI_ISL_2", "EPI_ISL_3"],
+        "ISO": ["MOW", "MOW", "SPE"],
+        "Collection week": ["2022-W01", "2022-W02", "2022-W02"],
+        "Pango lineage": ["BA.1", "BA.2", "BA.1"],
+        "Pango lineage combo": ["BA.1.*", "BA.2", "BA.1.*"],
+        "AA Substitutions": ["(Spike_N501Y)", "(Spike_N501Y,Spike_K417N)", "()"],
+        "RII": [True, False, True],
+    }
+)
+
+
+@pytest.fixture
+def service(tmp_path) -> MetadataService:
+    path = tmp_path / "metadata.tsv"
+    METADATA.to_csv(path, sep="\t", index=False)
+    return MetadataService.from_file(path)
+
+
+@pytest.fixture
+def service_url(service):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url: str) -> tuple[int, object]:
+    try:
+        with urlopen(url) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_count_frequency(service_url):
+    status, data = get(f"{service_url}/count_frequency?column=Pango+lineage")
+
+    assert status == 200
+    assert [row["Pango lineage Count"] for row in data] == [2, 1]
+
+
+def test_missing_parameter_is_bad_request(service_url):
+    status, data = get(f"{service_url}/count_frequency")
+
+    assert status == 400
+    assert data == {"error": "Missing required parameter: column"}
+
+
+def test_table_is_typed(service):
+    assert service.df["ISO"].dtype == "category"
+    assert service.df["RII"].dtype == "boolean"
+    assert service.df["Collection week"].dtype == "string"
+
+
+def test_variant_region_proportion(service_url):
+    status, data = get(
+        f"{service_url}/variant_region_proportion?pango_lineage=BA.1&rii_only=1"
+    )
+
+    assert status == 200
+    assert [(row["ISO"], row["Proportion"]) for row in data] == [
+        ("MOW", 100),
+        ("SPE", 100),
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("pango_bar?time_step=year", "time_step must be one of: day, week, month"),
+        ("pango_bar?format=xml", "format must be one of: json, tsv, svg, png"),
+        ("pango_bar?frequency_cutoff=abc", "Invalid frequency_cutoff: abc"),
+        ("spike_substitutions", "Missing required parameter: pango_lineage"),
+        ("variant_region_proportion", "Missing required parameter: pango_lineage"),
+        ("count_frequency?column=Region", "Unknown column: 'Region'"),
+    ],
+)
+def test_invalid_parameters_are_bad_request(service_url, query, message):
+    assert get(f"{service_url}/{query}") == (400, {"error": message})
+
+
+def test_unknown_operation_is_not_found(service_url):
+    assert get(f"{service_url}/pie_chart") == (
+        404,
+        {"error": "Unknown operation: pie_chart"},
+    )
@@ -0,0 +1,157 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from rii.vgarus.client import SUBMIT_ENDPOINT, Checkpoint, VgarusClient
+from rii.vgarus.models import Sample
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class StubServer(ThreadingHTTPServer):
+    """VGARUS stand-in recording received sample names.
+
+    statuses are returned to the first requests in turn, then 200.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, statuses: list[int] = (), delay: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.received: Counter = Counter()
+        self.requests = 0
+        self.idempotency_keys: list[str] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        server: StubServer = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(server.delay)
+        with server.lock:
+            server.requests += 1
+            server.idempotency_keys.append(self.headers["Idempotency-Key"])
+            status = server.statuses.pop(0) if server.statuses else 200
+            if status == 200 and self.path == SUBMIT_ENDPOINT:
+                server.received.update(item["name"] for item in body)
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(**kwargs) -> StubServer:
+        server = StubServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_samples(n: int) -> list[Sample]:
+    return [
+        Sample(name=f"sample{i}", metadata={"Lab ID": str(i)}, sequence="ACGT")
+        for i in range(n)
+    ]
+
+
+def test_retries_service_unavailable(make_server):
+    server = make_server(statuses=[503, 429])
+    with VgarusClient("user", "pass", base_url=server.url, backoff=0) as client:
+        submitted, failed = client.upload(make_samples(30), batch_size=10)
+
+    assert (submitted, failed) == (30, 0)
+    assert server.requests == 5
+    assert set(server.received.values()) == {1}
+    # Retries of a batch carry the same key
+    assert len(set(server.idempotency_keys)) == 3
+
+
+def test_does_not_retry_server_error(make_server, tmp_path):
+    server = make_server(statuses=[500])
+    checkpoint = Checkpoint(tmp_path / "package.json.done")
+    with VgarusClient("user", "pass", base_url=server.url, workers=1) as client:
+        submitted, failed = client.upload(
+            make_samples(20), batch_size=10, checkpoint=checkpoint
+        )
+
+    assert (submitted, failed) == (10, 10)
+    assert server.requests == 2
+    assert checkpoint.done == set(server.received)
+
+
+def test_resumes_from_checkpoint(make_server, tmp_path):
+    server = make_server()
+    samples = make_samples(50)
+    path = tmp_path / "package.json.done"
+    path.write_text("".join(f"{sample.name}\n" for sample in samples[:20]))
+
+    with VgarusClient("user", "pass", base_url=server.url) as client:
+        submitted, failed = client.upload(
+            samples, batch_size=10, checkpoint=Checkpoint(path)
+        )
+
+    assert (submitted, failed) == (30, 0)
+    assert set(server.received) == {sample.name for sample in samples[20:]}
+    assert Checkpoint(path).done == {sample.name for sample in samples}
+
+
+def test_interrupted_upload_checkpoints_everything_sent(make_server, tmp_path):
+    server = make_server(delay=0.1)
+    samples = make_samples(400)
+    package = tmp_path / "package.json"
+    package.write_text(json.dumps([dict(sample) for sample in samples]))
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "rii.vgarus.cli", "upload", str(package)]
+        + ["--url", server.url, "--batch-size", "10", "--workers", "4"],
+        cwd=tmp_path,
+        env={
+            **os.environ,
+            "PYTHONPATH": str(ROOT),
+            "VGARUS_USERNAME": "user",
+            "VGARUS_PASSWORD": "pass",
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while server.requests < 8 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    process.send_signal(signal.SIGINT)
+    assert process.wait(timeout=30) != 0
+
+    checkpoint = Checkpoint(tmp_path / "package.json.done")
+    assert 0 < len(server.received) < len(samples)
+    assert checkpoint.done == set(server.received)
+
+    with VgarusClient("user", "pass", base_url=server.url) as client:
+        client.upload(samples, batch_size=10, checkpoint=checkpoint)
+    assert set(server.received) == {sample.name for sample in samples}
+    assert set(server.received.values()) == {1}